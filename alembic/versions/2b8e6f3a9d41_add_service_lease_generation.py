@@ -0,0 +1,25 @@
+"""Add service lease generation
+
+Revision ID: 2b8e6f3a9d41
+Revises: f1a6c3d8e925
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8e6f3a9d41'
+down_revision = 'f1a6c3d8e925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('service_leases', sa.Column('generation', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('service_leases') as batch_op:
+        batch_op.drop_column('generation')
@@ -0,0 +1,39 @@
+"""Add balance checkpoints
+
+Revision ID: 4c1e9a7d2b35
+Revises: b34c164fb4e7
+Create Date: 2026-10-18 19:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e9a7d2b35'
+down_revision = 'b34c164fb4e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('addresses', sa.Column('transaction_count', sa.Integer(), server_default=sa.text('0'), nullable=True))
+    op.create_table('balance_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('address_id', sa.Integer(), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['address_id'], ['addresses.id'], ),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_checkpoint_address_timestamp', 'balance_checkpoints', ['address_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_balance_checkpoints_id'), 'balance_checkpoints', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_balance_checkpoints_id'), table_name='balance_checkpoints')
+    op.drop_index('idx_checkpoint_address_timestamp', table_name='balance_checkpoints')
+    op.drop_table('balance_checkpoints')
+    op.drop_column('addresses', 'transaction_count')
@@ -0,0 +1,31 @@
+"""Add principal changes
+
+Revision ID: 6e2a9f4c1d73
+Revises: 9c4d7e1b2f58
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2a9f4c1d73'
+down_revision = '9c4d7e1b2f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('principal_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_principal_change_changed_at', 'principal_changes', ['changed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_principal_change_changed_at', table_name='principal_changes')
+    op.drop_table('principal_changes')
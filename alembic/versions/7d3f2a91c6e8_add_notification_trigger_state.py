@@ -0,0 +1,30 @@
+"""Add notification trigger state
+
+Revision ID: 7d3f2a91c6e8
+Revises: 4c1e9a7d2b35
+Create Date: 2026-10-18 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f2a91c6e8'
+down_revision = '4c1e9a7d2b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('notifications', sa.Column('hysteresis', sa.Float(), server_default=sa.text('0'), nullable=False))
+    op.add_column('notifications', sa.Column('cooldown_minutes', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('notifications', sa.Column('is_triggered', sa.Boolean(), server_default=sa.text('0'), nullable=False))
+    op.add_column('notifications', sa.Column('last_triggered_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('notifications', 'last_triggered_at')
+    op.drop_column('notifications', 'is_triggered')
+    op.drop_column('notifications', 'cooldown_minutes')
+    op.drop_column('notifications', 'hysteresis')
@@ -0,0 +1,25 @@
+"""Add service lease tick sequence
+
+Revision ID: 9c4d7e1b2f58
+Revises: 2b8e6f3a9d41
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d7e1b2f58'
+down_revision = '2b8e6f3a9d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('service_leases', sa.Column('tick_sequence', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('service_leases') as batch_op:
+        batch_op.drop_column('tick_sequence')
@@ -0,0 +1,26 @@
+"""Add notification log indexes
+
+Revision ID: a82e5c4b91d0
+Revises: 7d3f2a91c6e8
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a82e5c4b91d0'
+down_revision = '7d3f2a91c6e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_notification_log_notification_triggered', 'notification_logs', ['notification_id', 'triggered_at'], unique=False)
+    op.create_index('idx_notification_log_triggered_at', 'notification_logs', ['triggered_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_notification_log_triggered_at', table_name='notification_logs')
+    op.drop_index('idx_notification_log_notification_triggered', table_name='notification_logs')
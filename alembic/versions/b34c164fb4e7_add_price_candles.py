@@ -0,0 +1,43 @@
+"""Add price candles
+
+Revision ID: b34c164fb4e7
+Revises: 839c8b2fc173
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b34c164fb4e7'
+down_revision = '839c8b2fc173'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('price_candles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('crypto', sa.Enum('BTC', 'ETH', name='cryptotype'), nullable=False),
+    sa.Column('interval', sa.Enum('HOUR', 'DAY', name='candleinterval'), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('open_usd', sa.Float(), nullable=False),
+    sa.Column('high_usd', sa.Float(), nullable=False),
+    sa.Column('low_usd', sa.Float(), nullable=False),
+    sa.Column('close_usd', sa.Float(), nullable=False),
+    sa.Column('open_brl', sa.Float(), nullable=False),
+    sa.Column('high_brl', sa.Float(), nullable=False),
+    sa.Column('low_brl', sa.Float(), nullable=False),
+    sa.Column('close_brl', sa.Float(), nullable=False),
+    sa.Column('first_at', sa.DateTime(), nullable=False),
+    sa.Column('last_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('crypto', 'interval', 'bucket_start', name='uq_price_candle_bucket')
+    )
+    op.create_index(op.f('ix_price_candles_id'), 'price_candles', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_price_candles_id'), table_name='price_candles')
+    op.drop_table('price_candles')
@@ -0,0 +1,31 @@
+"""Add service leases
+
+Revision ID: c5b7e2f04a19
+Revises: a82e5c4b91d0
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5b7e2f04a19'
+down_revision = 'a82e5c4b91d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('service_leases',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('holder', sa.String(length=100), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('payload_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('service_leases')
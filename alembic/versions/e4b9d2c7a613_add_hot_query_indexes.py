@@ -0,0 +1,53 @@
+"""Add hot query indexes
+
+Revision ID: e4b9d2c7a613
+Revises: c5b7e2f04a19
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9d2c7a613'
+down_revision = 'c5b7e2f04a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_address_user', 'addresses', ['user_id', 'id'], unique=False)
+    op.create_index('idx_transaction_address_timestamp', 'transactions', ['address_id', 'timestamp', 'id'], unique=False)
+    op.create_index('idx_notification_user', 'notifications', ['user_id', 'id'], unique=False)
+    op.create_index('idx_notification_active', 'notifications', ['is_active', 'id'], unique=False)
+
+    # Dono da notificação copiado para os logs: a listagem por usuário ordenada
+    # por triggered_at usa um único índice em vez de join + ordenação
+    # batch_alter_table: no SQLite a chave estrangeira exige recriar a tabela
+    with op.batch_alter_table('notification_logs') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE notification_logs SET user_id = "
+        "(SELECT notifications.user_id FROM notifications WHERE notifications.id = notification_logs.notification_id)"
+    )
+    with op.batch_alter_table('notification_logs') as batch_op:
+        batch_op.create_index('idx_notification_log_user_triggered', ['user_id', 'triggered_at', 'id'], unique=False)
+        batch_op.create_foreign_key('fk_notification_logs_user_id', 'users', ['user_id'], ['id'])
+
+def downgrade():
+    with op.batch_alter_table('notification_logs') as batch_op:
+        batch_op.drop_constraint('fk_notification_logs_user_id', type_='foreignkey')
+        batch_op.drop_index('idx_notification_log_user_triggered')
+        batch_op.drop_column('user_id')
+
+    if op.get_bind().dialect.name == 'mysql':
+        # O MySQL descarta o índice implícito das chaves estrangeiras quando um
+        # índice composto passa a cobri-las; recriá-lo antes de remover o composto
+        op.create_index('user_id', 'addresses', ['user_id'], unique=False)
+        op.create_index('address_id', 'transactions', ['address_id'], unique=False)
+        op.create_index('user_id', 'notifications', ['user_id'], unique=False)
+    op.drop_index('idx_notification_active', table_name='notifications')
+    op.drop_index('idx_notification_user', table_name='notifications')
+    op.drop_index('idx_transaction_address_timestamp', table_name='transactions')
+    op.drop_index('idx_address_user', table_name='addresses')
@@ -0,0 +1,31 @@
+"""Add notification changes
+
+Revision ID: f1a6c3d8e925
+Revises: e4b9d2c7a613
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c3d8e925'
+down_revision = 'e4b9d2c7a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('notification_id', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_notification_change_changed_at', 'notification_changes', ['changed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_notification_change_changed_at', table_name='notification_changes')
+    op.drop_table('notification_changes')
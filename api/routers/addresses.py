@@ -1,45 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from models import User, Address
-from schemas import AddressCreate, AddressResponse, TransactionCreate, TransactionResponse, BalanceResponse
-from crud import create_address, get_addresses, get_address, create_transaction, get_transactions, get_latest_price
-from dependencies import get_db, get_current_user
+from models import CryptoType
+from schemas import AddressCreate, AddressResponse, TransactionCreate, TransactionResponse, BalanceResponse, PortfolioResponse, BulkTransactionResponse
+from crud import create_address, get_address, create_transaction, transactions_query, to_utc_naive, TRANSACTION_COLUMNS
+from services.principal_cache import UserPrincipal
+from dependencies import get_db, get_read_session, get_current_user, read_sessionmaker, last_write
+import crud_async
+from config import BULK_TRANSACTION_CHUNK_SIZE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.price_cache import price_cache
+from services.portfolio_service import value_portfolio
+from services.bulk_transaction_service import iter_transaction_chunks, ingest_chunk
+from services.pagination import decode_cursor, paginate, stream_ndjson
+from services.serialization import address_serializer, transaction_serializer, json_response
+from services.single_flight import address_balance_flight
+from services.read_routing import recent_writers, wrote_recently
 
 router = APIRouter()
 
 @router.post("/", response_model=AddressResponse)
-def create_address_route(address: AddressCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_address_route(address: AddressCreate, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Criar novo endereço para o usuário"""
     return create_address(db, address, user.id)
 
 @router.get("/", response_model=list[AddressResponse])
-def list_addresses_route(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_addresses_route(user: UserPrincipal = Depends(get_current_user), db=Depends(get_read_session)):
     """Listar endereços do usuário"""
-    return get_addresses(db, user.id)
+    addresses = address_serializer.validate(await crud_async.get_address_balances(db, user.id))
+    return json_response(address_serializer.dumps(addresses))
+
+@router.get("/portfolio", response_model=PortfolioResponse)
+async def get_portfolio_route(user: UserPrincipal = Depends(get_current_user), db=Depends(get_read_session)):
+    """Obter saldos de todos os endereços do usuário com totais por ativo"""
+    portfolio = await value_portfolio(db, await crud_async.get_address_balances(db, user.id))
+    if portfolio is None:
+        raise HTTPException(status_code=404, detail="Dados de preço não disponíveis")
+    return portfolio
 
 @router.post("/transactions", response_model=TransactionResponse)
-def create_transaction_route(transaction: TransactionCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_transaction_route(transaction: TransactionCreate, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Criar nova transação"""
     address = get_address(db, transaction.address_id, user.id)
     if not address:
         raise HTTPException(status_code=404, detail="Endereço não encontrado")
     return create_transaction(db, transaction)
 
+@router.post("/transactions/bulk", response_model=BulkTransactionResponse)
+async def create_transactions_bulk_route(request: Request, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Importar transações em lote (array JSON ou NDJSON)"""
+    result = {"inserted": 0, "errors": []}
+    ownership = {}
+    async for chunk in iter_transaction_chunks(request, BULK_TRANSACTION_CHUNK_SIZE):
+        await run_in_threadpool(ingest_chunk, db, chunk, user.id, ownership, result)
+    result["errors"].sort(key=lambda error: error["index"])
+    return result
+
 @router.get("/{address_id}/transactions", response_model=list[TransactionResponse])
-def get_transactions_route(address_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Listar transações de um endereço"""
-    address = get_address(db, address_id, user.id)
+async def get_transactions_route(
+    address_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    user: UserPrincipal = Depends(get_current_user),
+    db=Depends(get_read_session)
+):
+    """Listar transações de um endereço (paginação por cursor ou stream NDJSON)"""
+    address = await crud_async.get_address(db, address_id, user.id)
     if not address:
         raise HTTPException(status_code=404, detail="Endereço não encontrado")
-    return get_transactions(db, address_id)
+    cursor = decode_cursor(after)
+    if stream:
+        return StreamingResponse(
+            stream_ndjson(
+                lambda stream_db: transactions_query(stream_db, address_id, cursor, TRANSACTION_COLUMNS), transaction_serializer,
+                read_sessionmaker(user.email, written_at=last_write(request))
+            ),
+            media_type="application/x-ndjson"
+        )
+    transactions = transaction_serializer.validate(await crud_async.get_transaction_rows(db, address_id, limit + 1, cursor))
+    transactions = paginate(response, transactions, limit, lambda t: (t["timestamp"], t["id"]))
+    return json_response(transaction_serializer.dumps(transactions), response)
 
-@router.get("/{address_id}/balance", response_model=BalanceResponse)
-def get_balance_route(address_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Obter saldo de um endereço"""
-    address = get_address(db, address_id, user.id)
+@router.get("/{address_id}/balance", response_model=BalanceResponse, response_model_exclude_none=True)
+async def get_balance_route(address_id: int, request: Request, at: Optional[datetime] = None, user: UserPrincipal = Depends(get_current_user), db=Depends(get_read_session)):
+    """Obter saldo de um endereço (atual ou em uma data via ?at=)"""
+    address = await _get_address_balance(db, address_id, user, last_write(request))
     if not address:
         raise HTTPException(status_code=404, detail="Endereço não encontrado")
-    price = get_latest_price(db, address.type)
+    if at is not None:
+        return await _get_balance_at(db, address, at)
+    price = await price_cache.aget(db, address.type)
     if not price:
         raise HTTPException(status_code=404, detail="Dados de preço não disponíveis")
     balance_usd = address.balance * price.price_usd
@@ -50,4 +105,32 @@ def get_balance_route(address_id: int, user: User = Depends(get_current_user), d
         "balance_brl": balance_brl,
         "balance_crypto": address.balance,
         "crypto_type": address.type.value
+    }
+
+async def _get_address_balance(db, address_id: int, user: UserPrincipal, written_at=None):
+    """Endereço e saldo, compartilhando a consulta entre requisições idênticas concorrentes"""
+    def load():
+        return crud_async.get_address_balance(db, address_id, user.id)
+
+    if recent_writers.is_recent(user.email) or wrote_recently(written_at):
+        # Logo após uma escrita do usuário, uma consulta em voo iniciada antes dela estaria desatualizada
+        return await load()
+    return await address_balance_flight.do((address_id, user.id), load)
+
+async def _get_balance_at(db, address, at: datetime):
+    """Saldo em uma data: checkpoint mais próximo + transações posteriores a ele"""
+    at = to_utc_naive(at)
+    price = await crud_async.get_price_at(db, CryptoType(address.type.value), at)
+    if price is None:
+        raise HTTPException(status_code=404, detail="Dados de preço não disponíveis")
+    price_usd, price_brl, price_timestamp = price
+    balance = await crud_async.get_balance_at(db, address.id, at)
+    return {
+        "address": address.address,
+        "balance_usd": balance * price_usd,
+        "balance_brl": balance * price_brl,
+        "balance_crypto": balance,
+        "crypto_type": address.type.value,
+        "at": at,
+        "price_timestamp": price_timestamp
     }
\ No newline at end of file
@@ -1,24 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from sqlalchemy.orm import Session
-from models import User
 from schemas import NotificationCreate, NotificationResponse, NotificationLogResponse
-from crud import create_notification, get_notifications, get_notification, toggle_notification, delete_notification, get_notification_logs
-from dependencies import get_db, get_current_user
+from crud import create_notification, get_notification, toggle_notification, delete_notification, notification_logs_query, NOTIFICATION_LOG_COLUMNS
+from services.principal_cache import UserPrincipal
+from dependencies import get_db, get_read_session, get_current_user, read_sessionmaker, last_write
+import crud_async
+from config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.pagination import decode_cursor, paginate, stream_ndjson, iter_ndjson
+from services.serialization import notification_serializer, notification_log_serializer, json_response
+from services.log_archive_service import iter_archived_logs, read_archived_logs
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter()
 
 @router.post("/", response_model=NotificationResponse)
-def create_notification_route(notification: NotificationCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_notification_route(notification: NotificationCreate, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Criar nova notificação de preço"""
     return create_notification(db, notification, user.id)
 
 @router.get("/", response_model=list[NotificationResponse])
-def list_notifications_route(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_notifications_route(user: UserPrincipal = Depends(get_current_user), db=Depends(get_read_session)):
     """Listar notificações do usuário"""
-    return get_notifications(db, user.id)
+    notifications = notification_serializer.validate(await crud_async.get_notification_rows(db, user.id))
+    return json_response(notification_serializer.dumps(notifications))
 
 @router.put("/{notification_id}/toggle")
-def toggle_notification_route(notification_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def toggle_notification_route(notification_id: int, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Ativar/desativar notificação"""
     notification = get_notification(db, notification_id, user.id)
     if not notification:
@@ -27,7 +36,7 @@ def toggle_notification_route(notification_id: int, user: User = Depends(get_cur
     return {"message": f"Notificação {'ativada' if notification.is_active else 'desativada'} com sucesso"}
 
 @router.delete("/{notification_id}")
-def delete_notification_route(notification_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_notification_route(notification_id: int, user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_db)):
     """Deletar notificação"""
     notification = get_notification(db, notification_id, user.id)
     if not notification:
@@ -36,6 +45,40 @@ def delete_notification_route(notification_id: int, user: User = Depends(get_cur
     return {"message": "Notificação deletada com sucesso"}
 
 @router.get("/logs", response_model=list[NotificationLogResponse])
-def get_notification_logs_route(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Listar logs de notificações do usuário"""
-    return get_notification_logs(db, user.id)
\ No newline at end of file
+async def get_notification_logs_route(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    include_archived: bool = False,
+    user: UserPrincipal = Depends(get_current_user),
+    db=Depends(get_read_session)
+):
+    """Listar logs de notificações do usuário (paginação por cursor ou stream NDJSON).
+
+    Por padrão apenas a tabela quente é consultada; include_archived continua
+    a listagem pelos meses arquivados em disco.
+    """
+    cursor = decode_cursor(after)
+    if stream:
+        return StreamingResponse(
+            _stream_logs(user.id, cursor, include_archived, read_sessionmaker(user.email, written_at=last_write(request))),
+            media_type="application/x-ndjson"
+        )
+    logs = await crud_async.get_notification_log_rows(db, user.id, limit + 1, cursor)
+    if include_archived and len(logs) <= limit:
+        # Os meses arquivados são sempre anteriores aos da tabela quente
+        archived = await run_in_threadpool(read_archived_logs, user.id, limit + 1 - len(logs), cursor)
+        logs = list(logs) + archived
+    logs = paginate(response, notification_log_serializer.validate(logs), limit, lambda log: (log["triggered_at"], log["id"]))
+    return json_response(notification_log_serializer.dumps(logs), response)
+
+def _stream_logs(user_id: int, cursor, include_archived: bool, session_factory):
+    """NDJSON da tabela quente seguido, se pedido, dos logs arquivados"""
+    yield from stream_ndjson(
+        lambda stream_db: notification_logs_query(stream_db, user_id, cursor, NOTIFICATION_LOG_COLUMNS), notification_log_serializer,
+        session_factory
+    )
+    if include_archived:
+        yield from iter_ndjson(iter_archived_logs(user_id, cursor), notification_log_serializer)
@@ -1,35 +1,58 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from datetime import datetime
-from models import Price, CryptoType
-from schemas import PriceResponse
-from dependencies import get_db
+from models import CryptoType, CandleInterval
+from schemas import PriceCandleResponse
+from dependencies import get_read_session
+from services.price_cache import price_cache
+from services.readiness import readiness
+from crud import to_utc_naive
+import crud_async
+import structlog
+
+logger = structlog.get_logger()
 
 router = APIRouter()
 
+def _database_status():
+    """Estado do pool do banco segundo o aquecimento (sem consultar o banco)"""
+    if readiness.checks["database_pool"] is not None:
+        return "connected"
+    return "error" if readiness.error is not None else "warming"
+
+async def _price_status(db, crypto: CryptoType):
+    latest = await price_cache.aget(db, crypto)
+    return {
+        "price_usd": latest.price_usd if latest else None,
+        "price_brl": latest.price_brl if latest else None,
+        "last_updated": latest.last_updated if latest else None,
+        "age_seconds": price_cache.age_seconds(crypto)
+    }
+
 @router.get("/status")
-def get_status(db: Session = Depends(get_db)):
+async def get_status(db=Depends(get_read_session)):
     """Verificar status do sistema e últimos preços atualizados"""
     try:
-        latest_btc = db.query(Price).filter(Price.crypto == CryptoType.BTC).order_by(Price.last_updated.desc()).first()
-        latest_eth = db.query(Price).filter(Price.crypto == CryptoType.ETH).order_by(Price.last_updated.desc()).first()
         return {
             "status": "online",
-            "database": "connected",
+            "database": _database_status(),
+            "source": "cache",
             "price_updates": {
-                "btc": {
-                    "price_usd": latest_btc.price_usd if latest_btc else None,
-                    "price_brl": latest_btc.price_brl if latest_btc else None,
-                    "last_updated": latest_btc.last_updated if latest_btc else None
-                },
-                "eth": {
-                    "price_usd": latest_eth.price_usd if latest_eth else None,
-                    "price_brl": latest_eth.price_brl if latest_eth else None,
-                    "last_updated": latest_eth.last_updated if latest_eth else None
-                }
+                crypto.value.lower(): await _price_status(db, crypto) for crypto in CryptoType
             },
             "timestamp": datetime.utcnow()
         }
     except Exception as e:
         logger.error(f"Erro ao verificar status: {e}")
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+@router.get("/history", response_model=list[PriceCandleResponse])
+async def get_price_history(
+    crypto: CryptoType,
+    interval: CandleInterval = CandleInterval.HOUR,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db=Depends(get_read_session)
+):
+    """Histórico de preços em candles OHLC (1h ou 1d)"""
+    return await crud_async.get_price_candles(db, crypto, interval, to_utc_naive(start), to_utc_naive(end))
\ No newline at end of file
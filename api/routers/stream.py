@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
+from models import CryptoType
+from dependencies import SessionLocal, get_current_user
+from services.principal_cache import UserPrincipal
+from services.event_bus import event_bus, DROPPED
+from services.price_cache import price_cache
+from services.stream_service import PRICES_TOPIC, NOTIFICATIONS_TOPIC, price_message, sse_message
+from config import STREAM_KEEPALIVE_SECONDS
+import asyncio
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
+
+async def get_stream_user(token: Optional[str] = Depends(optional_oauth2_scheme), access_token: Optional[str] = None) -> UserPrincipal:
+    """Autenticar pelo header Authorization ou por ?access_token= (EventSource não envia headers).
+
+    Usa uma sessão própria e já fechada ao iniciar o stream, para que
+    conexões ociosas não retenham conexões do pool.
+    """
+    token = token or access_token
+    if token is None:
+        raise HTTPException(status_code=401, detail="Não autenticado")
+    db = SessionLocal()
+    try:
+        return await get_current_user(token, db)
+    finally:
+        db.close()
+
+async def _events(topic: str, key=None, initial=()):
+    """Gerar o stream SSE de um tópico com keep-alive periódico"""
+    subscription = event_bus.subscribe(topic, key)
+    try:
+        for message in initial:
+            yield message
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is DROPPED:
+                yield sse_message("dropped", {"detail": "Cliente lento demais; reconecte"})
+                return
+            yield message
+    finally:
+        event_bus.unsubscribe(subscription)
+
+@router.get("/prices")
+async def stream_prices():
+    """Stream SSE dos ticks de preço (evento price por criptomoeda)"""
+    initial = []
+    for crypto in CryptoType:
+        cached = price_cache.peek(crypto)
+        if cached is not None:
+            initial.append(price_message(crypto, cached.price_usd, cached.price_brl, cached.last_updated))
+    return StreamingResponse(_events(PRICES_TOPIC, initial=initial), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/notifications")
+async def stream_notifications(user: UserPrincipal = Depends(get_stream_user)):
+    """Stream SSE das notificações disparadas do usuário (evento notification)"""
+    return StreamingResponse(_events(NOTIFICATIONS_TOPIC, key=user.id), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,45 @@
+"""Comparar dois resultados de benchmarks.run.
+
+    python -m benchmarks.compare benchmarks/results/antes.json benchmarks/results/depois.json
+"""
+import argparse
+import json
+
+def _change(before, after):
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+def _rows(baseline: dict, candidate: dict):
+    for name, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(name)
+        if after is not None:
+            yield name, before, after
+    for name in ("fetch_prices", "check_notifications", "save_prices_to_db"):
+        before = baseline["engine"].get(name)
+        after = candidate["engine"].get(name)
+        if before is not None and after is not None:
+            yield name, before, after
+    for name, before in baseline.get("serialization", {}).items():
+        after = candidate.get("serialization", {}).get(name)
+        if after is not None:
+            yield f"serialization {name}", before, after
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparar dois resultados de benchmark")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+
+    for meta in ("scale", "database", "requests_per_route", "notification_shards"):
+        if baseline["meta"].get(meta) != candidate["meta"].get(meta):
+            print(f"⚠️ {meta} difere: {baseline['meta'].get(meta)} vs {candidate['meta'].get(meta)}")
+    print(f"{'':40s} {'p50 antes':>11s} {'p50 depois':>11s} {'Δp50':>8s} {'p99 antes':>11s} {'p99 depois':>11s} {'Δp99':>8s}")
+    for name, before, after in _rows(baseline, candidate):
+        print(f"{name:40s} {before['p50_ms']:9.3f}ms {after['p50_ms']:9.3f}ms {_change(before['p50_ms'], after['p50_ms'])} "
+              f"{before['p99_ms']:9.3f}ms {after['p99_ms']:9.3f}ms {_change(before['p99_ms'], after['p99_ms'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Verificar o orçamento de consultas SQL de cada rota.
+
+Executa cada cenário de benchmarks.run uma vez (com cache de autenticação e
+de preços já aquecidos) e falha se alguma rota exceder o número máximo de
+consultas ou repetir consultas (padrão N+1).
+
+    python -m benchmarks.query_budgets
+"""
+import argparse
+import sys
+
+# rota: (máximo de consultas, máximo de repetições)
+QUERY_BUDGETS = {
+    "GET /health": (0, 0),
+    "POST /users/login": (1, 0),
+    "GET /addresses/": (1, 0),
+    "GET /addresses/portfolio": (1, 0),
+    "GET /addresses/{id}/transactions": (2, 0),
+    "GET /addresses/{id}/transactions?limit=1000": (2, 0),
+    "GET /addresses/{id}/transactions?stream": (2, 0),
+    "GET /addresses/{id}/balance": (1, 0),
+    "GET /addresses/{id}/balance?at": (6, 0),
+    "POST /addresses/transactions": (4, 0),
+    "GET /notifications/": (1, 0),
+    "GET /notifications/logs": (1, 0),
+    "GET /prices/status": (0, 0),
+    "GET /prices/history": (1, 0),
+}
+
+def main(argv=None):
+    from benchmarks.run import add_database_arguments, prepare, endpoint_scenarios
+    parser = argparse.ArgumentParser(description="Orçamento de consultas SQL por rota")
+    add_database_arguments(parser)
+    args = parser.parse_args(argv)
+
+    client, headers, ids, _ = prepare(parser, args)
+    from services.sql_profiler import assert_query_budget
+
+    failures = 0
+    for name, method, path, make_kwargs, _ in endpoint_scenarios(ids):
+        client.request(method, path, headers=headers, **make_kwargs())  # Aquecer caches
+        max_queries, max_duplicates = QUERY_BUDGETS[name]
+        try:
+            with assert_query_budget(max_queries, max_duplicates) as profile:
+                client.request(method, path, headers=headers, **make_kwargs())
+            print(f"✅ {name:40s} {profile.count} consulta(s)")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {name:40s} {e}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
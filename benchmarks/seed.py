@@ -0,0 +1,127 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from models import (Base, User, Address, Transaction, BalanceCheckpoint, Price, Notification, NotificationLog,
+                    AddressType, CryptoType, NotificationType)
+from config import BALANCE_CHECKPOINT_INTERVAL
+from services.password_service import pwd_context
+from services.price_rollup_service import update_candles
+import random
+import structlog
+
+logger = structlog.get_logger()
+
+# Volumes sintéticos por escala; o endereço principal do usuário de benchmark
+# recebe sempre `transactions` transações
+SCALES = {
+    "10k": {"notifications": 10_000, "addresses": 10_000, "transactions": 100_000},
+    "100k": {"notifications": 100_000, "addresses": 100_000, "transactions": 100_000},
+    "1m": {"notifications": 1_000_000, "addresses": 1_000_000, "transactions": 100_000},
+    "10m": {"notifications": 10_000_000, "addresses": 1_000_000, "transactions": 100_000},
+}
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "benchmark-password"
+BASE_PRICES = {CryptoType.BTC: (60000.0, 300000.0), CryptoType.ETH: (3000.0, 15000.0)}
+ADDRESSES_PER_USER = 10
+PRICE_HISTORY_HOURS = 24 * 30
+NOTIFICATION_LOGS = 10_000
+BATCH_SIZE = 10_000
+
+def _insert_batches(db: Session, model, rows):
+    """Inserir um iterável de dicts em lotes com executemany"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+    db.commit()
+
+def random_walk(rng: random.Random, steps: int):
+    """Sequência reproduzível de preços {CryptoType: {"usd", "brl"}} em torno dos preços base"""
+    current = dict(BASE_PRICES)
+    for _ in range(steps):
+        current = {
+            crypto: (usd * (1 + rng.gauss(0, 0.01)), brl * (1 + rng.gauss(0, 0.01)))
+            for crypto, (usd, brl) in current.items()
+        }
+        yield {crypto: {"usd": usd, "brl": brl} for crypto, (usd, brl) in current.items()}
+
+def seed(db: Session, scale: str, rng_seed: int = 42):
+    """Popular o banco com dados sintéticos reproduzíveis da escala informada.
+
+    Retorna os ids usados pelos cenários (usuário e endereço principal).
+    """
+    sizes = SCALES[scale]
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+
+    users = max(1, sizes["addresses"] // ADDRESSES_PER_USER)
+    logger.info(f"🌱 Criando {users} usuário(s) e {sizes['addresses']} endereço(s)")
+    _insert_batches(db, User, (
+        {"id": user_id, "name": f"Bench {user_id}", "email": BENCH_EMAIL if user_id == 1 else f"bench{user_id}@example.com",
+         "password": hashed_password, "is_active": True}
+        for user_id in range(1, users + 1)
+    ))
+    _insert_batches(db, Address, (
+        {"id": address_id, "user_id": (address_id - 1) // ADDRESSES_PER_USER % users + 1,
+         "address": f"bc1qbench{address_id:012d}" if address_id % 2 else f"0xbench{address_id:012d}",
+         "type": AddressType.BTC if address_id % 2 else AddressType.ETH,
+         "balance": rng.uniform(0, 10), "transaction_count": 0}
+        for address_id in range(1, sizes["addresses"] + 1)
+    ))
+
+    logger.info(f"🌱 Criando {sizes['transactions']} transação(ões) no endereço principal")
+    start = now - timedelta(days=365)
+    step = timedelta(days=365) / sizes["transactions"]
+    amounts = [rng.uniform(-0.5, 1.0) for _ in range(sizes["transactions"])]
+    _insert_batches(db, Transaction, (
+        {"id": index + 1, "address_id": 1, "tx_hash": f"bench-{index}", "amount": amount, "timestamp": start + step * index}
+        for index, amount in enumerate(amounts)
+    ))
+    running = 0.0
+    checkpoints = []
+    for index, amount in enumerate(amounts):
+        running += amount
+        if (index + 1) % BALANCE_CHECKPOINT_INTERVAL == 0:
+            checkpoints.append({"address_id": 1, "transaction_id": index + 1, "timestamp": start + step * index, "balance": running})
+    _insert_batches(db, BalanceCheckpoint, checkpoints)
+    db.query(Address).filter(Address.id == 1).update(
+        {Address.balance: running, Address.transaction_count: len(amounts)}, synchronize_session=False
+    )
+    db.commit()
+
+    logger.info(f"🌱 Criando {PRICE_HISTORY_HOURS} hora(s) de histórico de preços")
+    for hour, prices in enumerate(random_walk(rng, PRICE_HISTORY_HOURS)):
+        timestamp = now - timedelta(hours=PRICE_HISTORY_HOURS - hour)
+        for crypto, price in prices.items():
+            db.add(Price(crypto=crypto, price_usd=price["usd"], price_brl=price["brl"], last_updated=timestamp))
+            update_candles(db, crypto, price["usd"], price["brl"], timestamp)
+        db.commit()  # Um tick por transação, como em save_prices_to_db
+
+    logger.info(f"🌱 Criando {sizes['notifications']} notificação(ões)")
+    cryptos = list(CryptoType)
+    notification_types = list(NotificationType)
+    _insert_batches(db, Notification, (
+        {"id": notification_id, "user_id": (notification_id - 1) % users + 1,
+         "crypto_type": crypto, "notification_type": rng.choice(notification_types),
+         "threshold_value": BASE_PRICES[crypto][0] * rng.uniform(0.9, 1.1), "is_active": True, "created_at": now}
+        for notification_id in range(1, sizes["notifications"] + 1)
+        for crypto in [rng.choice(cryptos)]
+    ))
+    _insert_batches(db, NotificationLog, (
+        {"notification_id": 1 + users * rng.randrange(max(1, sizes["notifications"] // users)), "user_id": 1,
+         "crypto_type": CryptoType.BTC, "current_price_usd": BASE_PRICES[CryptoType.BTC][0],
+         "current_price_brl": BASE_PRICES[CryptoType.BTC][1], "threshold_value": BASE_PRICES[CryptoType.BTC][0],
+         "triggered_at": now - timedelta(minutes=index * 5)}
+        for index in range(NOTIFICATION_LOGS)
+    ))
+    return {"user_id": 1, "address_id": 1, "email": BENCH_EMAIL, "password": BENCH_PASSWORD, "seeded_at": now}
+
+def reset_schema(engine):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
@@ -1,12 +1,18 @@
+from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import Session
-from models import User, Address, Transaction, Price, Notification, NotificationLog
+from models import User, Address, Transaction, BalanceCheckpoint, Price, PriceCandle, CandleInterval, Notification, NotificationChange, NotificationLog, PrincipalChange
 from schemas import UserCreate, AddressCreate, TransactionCreate, NotificationCreate
-from passlib.context import CryptContext
+from services.principal_cache import principal_cache
+from config import BALANCE_CHECKPOINT_INTERVAL, PRINCIPAL_CACHE_TTL_SECONDS
+from datetime import datetime, timedelta, timezone
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def to_utc_naive(value: datetime):
+    """Datas do banco são UTC sem fuso: converter datas com fuso recebidas na API"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: str):
     db_user = User(name=user.name, email=user.email, password=hashed_password, is_active=True)
     db.add(db_user)
     db.commit()
@@ -16,11 +22,36 @@ def create_user(db: Session, user: UserCreate):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def update_user(db: Session, user: User, user_update):
+def _record_principal_change(db: Session, email: str):
+    # Na mesma transação da alteração: os caches de principal dos demais processos a aplicam
+    db.query(PrincipalChange).filter(
+        PrincipalChange.changed_at < datetime.utcnow() - timedelta(seconds=2 * PRINCIPAL_CACHE_TTL_SECONDS)
+    ).delete(synchronize_session=False)
+    db.add(PrincipalChange(email=email))
+
+def get_principal_changes(db: Session, after_id: int):
+    return db.query(PrincipalChange.id, PrincipalChange.email).filter(PrincipalChange.id > after_id).all()
+
+def update_user(db: Session, user_id: int, user_update):
+    user = db.get(User, user_id)
+    old_email = user.email
     user.name = user_update.name
     user.email = user_update.email
+    _record_principal_change(db, old_email)
+    if user.email != old_email:
+        _record_principal_change(db, user.email)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(old_email)
+    principal_cache.invalidate(user.email)
+    return user
+
+def deactivate_user(db: Session, user_id: int):
+    user = db.get(User, user_id)
+    user.is_active = False
+    _record_principal_change(db, user.email)
+    db.commit()
+    principal_cache.invalidate(user.email)
     return user
 
 def create_address(db: Session, address: AddressCreate, user_id: int):
@@ -33,27 +64,116 @@ def create_address(db: Session, address: AddressCreate, user_id: int):
 def get_addresses(db: Session, user_id: int):
     return db.query(Address).filter(Address.user_id == user_id).all()
 
+def get_address_balances(db: Session, user_id: int):
+    return db.query(Address.id, Address.address, Address.type, Address.balance).filter(Address.user_id == user_id).all()
+
+def get_address_balance(db: Session, address_id: int, user_id: int):
+    return db.query(Address.id, Address.address, Address.type, Address.balance).filter(
+        Address.id == address_id, Address.user_id == user_id
+    ).first()
+
 def get_address(db: Session, address_id: int, user_id: int):
     return db.query(Address).filter(Address.id == address_id, Address.user_id == user_id).first()
 
 def create_transaction(db: Session, transaction: TransactionCreate):
     db_transaction = Transaction(**transaction.dict())
     db.add(db_transaction)
-    address = db.query(Address).filter(Address.id == transaction.address_id).first()
+    address = db.get(Address, transaction.address_id)  # Já carregado pela rota: sem nova consulta
     address.balance += transaction.amount
+    address.transaction_count = (address.transaction_count or 0) + 1
+    if address.transaction_count % BALANCE_CHECKPOINT_INTERVAL == 0:
+        db.flush()
+        db.add(BalanceCheckpoint(
+            address_id=address.id,
+            transaction_id=db_transaction.id,
+            timestamp=db_transaction.timestamp,
+            balance=address.balance
+        ))
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
 
-def get_transactions(db: Session, address_id: int):
-    return db.query(Transaction).filter(Transaction.address_id == address_id).all()
+def _after(timestamp_column, id_column, after):
+    timestamp, row_id = after
+    return or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < row_id))
+
+# Colunas das listagens serializadas por services/serialization.py
+TRANSACTION_COLUMNS = (Transaction.id, Transaction.tx_hash, Transaction.amount, Transaction.timestamp)
+NOTIFICATION_COLUMNS = (
+    Notification.id, Notification.crypto_type, Notification.notification_type, Notification.threshold_value,
+    Notification.hysteresis, Notification.cooldown_minutes, Notification.is_triggered, Notification.last_triggered_at,
+    Notification.is_active, Notification.created_at
+)
+NOTIFICATION_LOG_COLUMNS = (
+    NotificationLog.id, NotificationLog.crypto_type, NotificationLog.current_price_usd,
+    NotificationLog.current_price_brl, NotificationLog.threshold_value, NotificationLog.triggered_at
+)
+
+def transactions_query(db: Session, address_id: int, after=None, columns=(Transaction,)):
+    query = db.query(*columns).filter(Transaction.address_id == address_id)
+    if after is not None:
+        query = query.filter(_after(Transaction.timestamp, Transaction.id, after))
+    return query.order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+
+def get_transactions(db: Session, address_id: int, limit: int = None, after=None):
+    return transactions_query(db, address_id, after).limit(limit).all()
+
+def get_transaction_rows(db: Session, address_id: int, limit: int = None, after=None):
+    return transactions_query(db, address_id, after, TRANSACTION_COLUMNS).limit(limit).all()
 
 def get_latest_price(db: Session, crypto: str):
     return db.query(Price).filter(Price.crypto == crypto).order_by(Price.last_updated.desc()).first()
 
+def get_balance_at(db: Session, address_id: int, at):
+    checkpoint = db.query(BalanceCheckpoint).filter(
+        BalanceCheckpoint.address_id == address_id, BalanceCheckpoint.timestamp <= at
+    ).order_by(BalanceCheckpoint.timestamp.desc(), BalanceCheckpoint.transaction_id.desc()).first()
+    tail = db.query(func.coalesce(func.sum(Transaction.amount), 0.0)).filter(
+        Transaction.address_id == address_id, Transaction.timestamp <= at
+    )
+    if checkpoint is None:
+        return tail.scalar()
+    tail = tail.filter(or_(
+        Transaction.timestamp > checkpoint.timestamp,
+        and_(Transaction.timestamp == checkpoint.timestamp, Transaction.id > checkpoint.transaction_id)
+    ))
+    return checkpoint.balance + tail.scalar()
+
+def get_price_at(db: Session, crypto, at):
+    """Preço (usd, brl, momento) mais próximo de at, usando candles para períodos já compactados"""
+    candidates = []
+    before = db.query(Price).filter(Price.crypto == crypto, Price.last_updated <= at).order_by(Price.last_updated.desc()).first()
+    if before is not None:
+        candidates.append((before.price_usd, before.price_brl, before.last_updated))
+    after = db.query(Price).filter(Price.crypto == crypto, Price.last_updated >= at).order_by(Price.last_updated).first()
+    if after is not None:
+        candidates.append((after.price_usd, after.price_brl, after.last_updated))
+    candle = db.query(PriceCandle).filter(
+        PriceCandle.crypto == crypto, PriceCandle.interval == CandleInterval.HOUR, PriceCandle.bucket_start <= at
+    ).order_by(PriceCandle.bucket_start.desc()).first()
+    if candle is not None:
+        candidates.append((candle.close_usd, candle.close_brl, candle.last_at))
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: abs((candidate[2] - at).total_seconds()))
+
+def get_price_candles(db: Session, crypto, interval, start=None, end=None):
+    query = db.query(PriceCandle).filter(PriceCandle.crypto == crypto, PriceCandle.interval == interval)
+    if start is not None:
+        query = query.filter(PriceCandle.bucket_start >= start)
+    if end is not None:
+        query = query.filter(PriceCandle.bucket_start <= end)
+    return query.order_by(PriceCandle.bucket_start).all()
+
+def _record_notification_change(db: Session, notification_id: int):
+    # Na mesma transação da alteração: os índices de notificações de todos os processos a aplicam no próximo tick
+    db.add(NotificationChange(notification_id=notification_id))
+
 def create_notification(db: Session, notification: NotificationCreate, user_id: int):
     db_notification = Notification(**notification.dict(), user_id=user_id, is_active=True)
     db.add(db_notification)
+    db.flush()
+    _record_notification_change(db, db_notification.id)
     db.commit()
     db.refresh(db_notification)
     return db_notification
@@ -61,17 +181,32 @@ def create_notification(db: Session, notification: NotificationCreate, user_id:
 def get_notifications(db: Session, user_id: int):
     return db.query(Notification).filter(Notification.user_id == user_id).all()
 
+def get_notification_rows(db: Session, user_id: int):
+    return db.query(*NOTIFICATION_COLUMNS).filter(Notification.user_id == user_id).all()
+
 def get_notification(db: Session, notification_id: int, user_id: int):
     return db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == user_id).first()
 
 def toggle_notification(db: Session, notification: Notification):
     notification.is_active = not notification.is_active
+    notification.is_triggered = False  # Rearmar ao reativar
+    _record_notification_change(db, notification.id)
     db.commit()
     return notification
 
 def delete_notification(db: Session, notification: Notification):
+    _record_notification_change(db, notification.id)
     db.delete(notification)
     db.commit()
 
-def get_notification_logs(db: Session, user_id: int):
-    return db.query(NotificationLog).join(Notification).filter(Notification.user_id == user_id).order_by(NotificationLog.triggered_at.desc()).all()
\ No newline at end of file
+def notification_logs_query(db: Session, user_id: int, after=None, columns=(NotificationLog,)):
+    query = db.query(*columns).filter(NotificationLog.user_id == user_id)
+    if after is not None:
+        query = query.filter(_after(NotificationLog.triggered_at, NotificationLog.id, after))
+    return query.order_by(NotificationLog.triggered_at.desc(), NotificationLog.id.desc())
+
+def get_notification_logs(db: Session, user_id: int, limit: int = None, after=None):
+    return notification_logs_query(db, user_id, after).limit(limit).all()
+
+def get_notification_log_rows(db: Session, user_id: int, limit: int = None, after=None):
+    return notification_logs_query(db, user_id, after, NOTIFICATION_LOG_COLUMNS).limit(limit).all()
@@ -0,0 +1,87 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud
+
+# Versões assíncronas das funções do crud.py. Com AsyncSession a função
+# síncrona roda via run_sync sobre a conexão assíncrona; com Session comum
+# ela é executada no threadpool, sem bloquear o event loop.
+
+async def _run(db, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def create_user(db, user, hashed_password: str):
+    return await _run(db, crud.create_user, user, hashed_password)
+
+async def get_user_by_email(db, email: str):
+    return await _run(db, crud.get_user_by_email, email)
+
+async def get_principal_changes(db, after_id: int):
+    return await _run(db, crud.get_principal_changes, after_id)
+
+async def update_user(db, user_id: int, user_update):
+    return await _run(db, crud.update_user, user_id, user_update)
+
+async def deactivate_user(db, user_id: int):
+    return await _run(db, crud.deactivate_user, user_id)
+
+async def create_address(db, address, user_id: int):
+    return await _run(db, crud.create_address, address, user_id)
+
+async def get_addresses(db, user_id: int):
+    return await _run(db, crud.get_addresses, user_id)
+
+async def get_address_balances(db, user_id: int):
+    return await _run(db, crud.get_address_balances, user_id)
+
+async def get_address_balance(db, address_id: int, user_id: int):
+    return await _run(db, crud.get_address_balance, address_id, user_id)
+
+async def get_address(db, address_id: int, user_id: int):
+    return await _run(db, crud.get_address, address_id, user_id)
+
+async def create_transaction(db, transaction):
+    return await _run(db, crud.create_transaction, transaction)
+
+async def get_transactions(db, address_id: int, limit: int = None, after=None):
+    return await _run(db, crud.get_transactions, address_id, limit, after)
+
+async def get_transaction_rows(db, address_id: int, limit: int = None, after=None):
+    return await _run(db, crud.get_transaction_rows, address_id, limit, after)
+
+async def get_latest_price(db, crypto):
+    return await _run(db, crud.get_latest_price, crypto)
+
+async def get_balance_at(db, address_id: int, at):
+    return await _run(db, crud.get_balance_at, address_id, at)
+
+async def get_price_at(db, crypto, at):
+    return await _run(db, crud.get_price_at, crypto, at)
+
+async def get_price_candles(db, crypto, interval, start=None, end=None):
+    return await _run(db, crud.get_price_candles, crypto, interval, start, end)
+
+async def create_notification(db, notification, user_id: int):
+    return await _run(db, crud.create_notification, notification, user_id)
+
+async def get_notifications(db, user_id: int):
+    return await _run(db, crud.get_notifications, user_id)
+
+async def get_notification_rows(db, user_id: int):
+    return await _run(db, crud.get_notification_rows, user_id)
+
+async def get_notification(db, notification_id: int, user_id: int):
+    return await _run(db, crud.get_notification, notification_id, user_id)
+
+async def toggle_notification(db, notification):
+    return await _run(db, crud.toggle_notification, notification)
+
+async def delete_notification(db, notification):
+    return await _run(db, crud.delete_notification, notification)
+
+async def get_notification_logs(db, user_id: int, limit: int = None, after=None):
+    return await _run(db, crud.get_notification_logs, user_id, limit, after)
+
+async def get_notification_log_rows(db, user_id: int, limit: int = None, after=None):
+    return await _run(db, crud.get_notification_log_rows, user_id, limit, after)
@@ -1,20 +1,69 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
-from config import DATABASE_URL, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from typing import Optional
+from config import (
+    DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, SECRET_KEY, ALGORITHM,
+    ASYNC_DATABASE_ENABLED, ASYNC_DATABASE_URL, ASYNC_DATABASE_POOL_SIZE, ASYNC_DATABASE_MAX_OVERFLOW,
+    DATABASE_READ_URL, DATABASE_READ_POOL_SIZE, DATABASE_READ_MAX_OVERFLOW, ASYNC_DATABASE_READ_URL
+)
 from models import User
+import crud_async
+from services.principal_cache import principal_cache, UserPrincipal
+from services.metrics import TimedQueuePool, TimedAsyncQueuePool, instrument_engine, READ_SESSIONS
+from services import sql_profiler
+from services.read_routing import recent_writers, current_subject, mark_writer, wrote_recently, LAST_WRITE_COOKIE, LAST_WRITE_HEADER
 
 # Configuração do banco de dados
-engine = create_engine(DATABASE_URL, pool_size=5, max_overflow=10)
+engine = create_engine(DATABASE_URL, pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_MAX_OVERFLOW, poolclass=TimedQueuePool)
+instrument_engine(engine, "sync")
+sql_profiler.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Usuário que grava no primário passa a ler do primário por READ_AFTER_WRITE_SECONDS
+event.listen(SessionLocal, "after_commit", mark_writer)
+
+# Engine assíncrono opcional (aiomysql / aiosqlite)
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_ENABLED:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_size=ASYNC_DATABASE_POOL_SIZE, max_overflow=ASYNC_DATABASE_MAX_OVERFLOW,
+        poolclass=TimedAsyncQueuePool
+    )
+    instrument_engine(async_engine.sync_engine, "async")
+    sql_profiler.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Réplica de leitura opcional (sem DATABASE_READ_URL, as leituras usam o primário)
+read_engine = None
+ReadSessionLocal = SessionLocal
+async_read_engine = None
+AsyncReadSessionLocal = AsyncSessionLocal
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL, pool_size=DATABASE_READ_POOL_SIZE, max_overflow=DATABASE_READ_MAX_OVERFLOW,
+        poolclass=TimedQueuePool, pool_pre_ping=True
+    )
+    instrument_engine(read_engine, "read")
+    sql_profiler.instrument_engine(read_engine)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    if ASYNC_DATABASE_ENABLED:
+        async_read_engine = create_async_engine(
+            ASYNC_DATABASE_READ_URL, pool_size=ASYNC_DATABASE_POOL_SIZE, max_overflow=ASYNC_DATABASE_MAX_OVERFLOW,
+            poolclass=TimedAsyncQueuePool, pool_pre_ping=True
+        )
+        instrument_engine(async_read_engine.sync_engine, "async_read")
+        sql_profiler.instrument_engine(async_read_engine.sync_engine)
+        AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
 
 # Configuração de autenticação
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Rotas de leitura públicas também aceitam o token, apenas para escolher réplica ou primário
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
 
 def get_db():
     db = SessionLocal()
@@ -23,8 +72,49 @@ def get_db():
     finally:
         db.close()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sessão das rotas de leitura: AsyncSession se o modo assíncrono estiver ativo
+get_session = get_async_db if ASYNC_DATABASE_ENABLED else get_db
+
+def token_subject(token):
+    """Subject (e-mail) de um token válido, sem consultar o banco"""
+    if token is None:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+def last_write(request: Request):
+    """Horário da última escrita informado pelo cliente (cookie ou header)"""
+    return request.cookies.get(LAST_WRITE_COOKIE) or request.headers.get(LAST_WRITE_HEADER)
+
+def read_sessionmaker(subject=None, asynchronous: bool = False, written_at=None):
+    """Fábrica de sessões de leitura: réplica, ou primário logo após uma escrita do usuário"""
+    if read_engine is None:
+        return AsyncSessionLocal if asynchronous else SessionLocal
+    if recent_writers.is_recent(subject) or wrote_recently(written_at):
+        READ_SESSIONS.labels("primary").inc()
+        return AsyncSessionLocal if asynchronous else SessionLocal
+    READ_SESSIONS.labels("replica").inc()
+    return AsyncReadSessionLocal if asynchronous else ReadSessionLocal
+
+def get_read_db(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    db = read_sessionmaker(token_subject(token), written_at=last_write(request))()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    async with read_sessionmaker(token_subject(token), asynchronous=True, written_at=last_write(request))() as db:
+        yield db
+
+# Sessão das rotas somente leitura (réplica, se configurada)
+get_read_session = get_async_read_db if ASYNC_DATABASE_ENABLED else get_read_db
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
@@ -32,15 +122,24 @@ def create_access_token(data: dict, expires_delta: timedelta):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_session)) -> UserPrincipal:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Token inválido")
-        user = db.query(User).filter(User.email == email).first()
-        if user is None or not user.is_active:
-            raise HTTPException(status_code=401, detail="Usuário inválido")
-        return user
+        after_id = principal_cache.sync_after()
+        if after_id is not None:
+            # Usuários alterados ou desativados em outros workers
+            principal_cache.apply_changes(await crud_async.get_principal_changes(db, after_id))
+        principal = principal_cache.get(email)
+        if principal is None:
+            user = await crud_async.get_user_by_email(db, email)
+            if user is None or not user.is_active:
+                raise HTTPException(status_code=401, detail="Usuário inválido")
+            principal = UserPrincipal.from_user(user)
+            principal_cache.put(email, principal)
+        current_subject.set(email)
+        return principal
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
\ No newline at end of file
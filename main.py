@@ -1,9 +1,21 @@
-from fastapi import FastAPI
-from sqlalchemy import text
+from fastapi import FastAPI, Response
+from contextlib import asynccontextmanager
 from models import Base
-from dependencies import SessionLocal, engine
-from api.routers import users, addresses, notifications, prices
-from services.price_service import update_prices
+from dependencies import SessionLocal, engine, async_engine, read_engine, async_read_engine
+from api.routers import users, addresses, notifications, prices, stream
+from services.price_service import update_prices, run_stream_relay, price_client
+from services.leader_service import price_leader
+from services.price_rollup_service import run_price_retention
+from config import PRICE_RETENTION_DAYS, SQL_PROFILING_ENABLED, SQL_PROFILING_SLOW_MS, STARTUP_RETRY_SECONDS
+from services.notification_shards import notification_shards
+from services.principal_cache import principal_cache
+from services.password_service import password_hasher
+from services.event_bus import event_bus
+from services.metrics import MetricsMiddleware, render as render_metrics, pool_stats
+from services.read_routing import recent_writers, ReadAfterWriteMiddleware
+from services.single_flight import single_flight_stats
+from services.sql_profiler import SqlProfilerMiddleware
+from services.readiness import readiness, prewarm_pool, prewarm_async_pool, load_latest_prices
 import asyncio
 import structlog
 import logging
@@ -21,35 +33,112 @@ structlog.configure(
 logger = structlog.get_logger()
 logging.getLogger().setLevel(logging.WARNING)
 
-app = FastAPI()
+async def warm_up(tasks: list):
+    """Aquecer o processo em background e então iniciar as tarefas periódicas.
+
+    Repete a partir da etapa que falhou enquanto o banco não responder; /ready
+    permanece 503 até todas as etapas terminarem.
+    """
+    while True:
+        try:
+            if readiness.checks["database_pool"] is None:
+                connections = 0
+                for pool_engine in filter(None, (engine, read_engine)):
+                    connections += await asyncio.to_thread(prewarm_pool, pool_engine)
+                for pool_engine in filter(None, (async_engine, async_read_engine)):
+                    connections += await prewarm_async_pool(pool_engine)
+                readiness.mark("database_pool", connections)
+                logger.info(f"✅ Conexão com banco de dados OK ({connections} conexão(ões) aquecida(s))")
+            await warm_prices()
+            break
+        except Exception as e:
+            readiness.fail(e)
+            logger.warning(f"⚠️ Banco de dados não disponível, nova tentativa em {STARTUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(STARTUP_RETRY_SECONDS)
+    logger.info(f"=== APLICAÇÃO PRONTA ({readiness.status()['warmup_seconds']}s) ===")
+
+    # Iniciar tarefa de atualização de preços
+    tasks.append(asyncio.create_task(update_prices()))
+    tasks.append(asyncio.create_task(run_stream_relay()))
+    logger.info("✅ Sistema de atualização de preços iniciado")
+    if PRICE_RETENTION_DAYS > 0:
+        tasks.append(asyncio.create_task(run_price_retention()))
+        logger.info(f"✅ Retenção de preços ativa ({PRICE_RETENTION_DAYS} dias)")
+
+async def warm_prices():
+    if readiness.checks["prices"] is None:
+        loaded = await asyncio.to_thread(load_latest_prices, SessionLocal, price_client.assets)
+        readiness.mark("prices", loaded)
+        logger.info(f"💰 {loaded} preço(s) carregado(s) no cache")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializar e liberar recursos da aplicação"""
+    logger.info("=== INICIANDO APLICAÇÃO ===")
+    event_bus.bind(asyncio.get_running_loop())
+    password_hasher.start()
+    await price_client.start()
+    tasks = []
+    # O aquecimento não bloqueia a inicialização: /health responde de imediato e /ready ao terminar
+    tasks.append(asyncio.create_task(warm_up(tasks)))
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    password_hasher.shutdown()
+    notification_shards.shutdown()
+    await price_client.close()
+    db = SessionLocal()
+    try:
+        price_leader.release(db)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível liberar o lease de preços: {e}")
+    finally:
+        db.close()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+if read_engine is not None:
+    app.add_middleware(ReadAfterWriteMiddleware)
+if SQL_PROFILING_ENABLED:
+    app.add_middleware(SqlProfilerMiddleware, slow_ms=SQL_PROFILING_SLOW_MS)
 
 # Registrar rotas
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(addresses.router, prefix="/addresses", tags=["addresses"])
 app.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 app.include_router(prices.router, prefix="/prices", tags=["prices"])
+app.include_router(stream.router, prefix="/stream", tags=["stream"])
 
 @app.get("/health")
 def health_check():
     """Verificar se a aplicação está funcionando"""
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
-@app.on_event("startup")
-async def startup_event():
-    """Inicializar aplicação"""
-    logger.info("=== INICIANDO APLICAÇÃO ===")
-    try:
-        # Testar conexão com banco
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
-        logger.info("✅ Conexão com banco de dados OK")
-        # Iniciar tarefa de atualização de preços
-        asyncio.create_task(update_prices())
-        logger.info("✅ Sistema de atualização de preços iniciado")
-    except Exception as e:
-        logger.warning(f"⚠️ Banco de dados não disponível: {e}")
-    logger.info("=== APLICAÇÃO PRONTA ===")
+@app.get("/ready")
+def readiness_check(response: Response):
+    """Verificar se o worker terminou o aquecimento e pode receber tráfego"""
+    if not readiness.ready:
+        response.status_code = 503
+    return {**readiness.status(), "timestamp": datetime.utcnow()}
+
+@app.get("/stats")
+def stats():
+    """Estatísticas dos caches em memória do processo"""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "database_pools": pool_stats(),
+        "recent_writers": len(recent_writers),
+        "single_flight": single_flight_stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas no formato do Prometheus"""
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
 
 # Criar tabelas no banco
 if __name__ == "__main__":
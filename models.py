@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Enum, Index, text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Enum, Index, UniqueConstraint, Text, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -21,6 +21,10 @@ class NotificationType(enum.Enum):
     LESS = "<"
     EQUAL = "=="
 
+class CandleInterval(enum.Enum):
+    HOUR = "1h"
+    DAY = "1d"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -38,8 +42,12 @@ class Address(Base):
     address = Column(String(100), nullable=False)
     type = Column(Enum(AddressType), nullable=False)
     balance = Column(Float, default=0.0)  # Saldo pré-calculado
+    transaction_count = Column(Integer, default=0, server_default=text("0"))
     user = relationship("User", back_populates="addresses")
     transactions = relationship("Transaction", back_populates="address")
+    __table_args__ = (
+        Index('idx_address_user', 'user_id', 'id'),
+    )
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -49,6 +57,21 @@ class Transaction(Base):
     amount = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     address = relationship("Address", back_populates="transactions")
+    __table_args__ = (
+        # Paginação (timestamp desc, id desc) e soma até uma data por endereço
+        Index('idx_transaction_address_timestamp', 'address_id', 'timestamp', 'id'),
+    )
+
+class BalanceCheckpoint(Base):
+    __tablename__ = "balance_checkpoints"
+    id = Column(Integer, primary_key=True, index=True)
+    address_id = Column(Integer, ForeignKey("addresses.id"), nullable=False)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    balance = Column(Float, nullable=False)  # Saldo acumulado até a transação (inclusive)
+    __table_args__ = (
+        Index('idx_checkpoint_address_timestamp', 'address_id', 'timestamp'),
+    )
 
 class Price(Base):
     __tablename__ = "prices"
@@ -61,6 +84,26 @@ class Price(Base):
         Index('idx_price_crypto_last_updated', 'crypto', 'last_updated'),
     )
 
+class PriceCandle(Base):
+    __tablename__ = "price_candles"
+    id = Column(Integer, primary_key=True, index=True)
+    crypto = Column(Enum(CryptoType), nullable=False)
+    interval = Column(Enum(CandleInterval), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    open_usd = Column(Float, nullable=False)
+    high_usd = Column(Float, nullable=False)
+    low_usd = Column(Float, nullable=False)
+    close_usd = Column(Float, nullable=False)
+    open_brl = Column(Float, nullable=False)
+    high_brl = Column(Float, nullable=False)
+    low_brl = Column(Float, nullable=False)
+    close_brl = Column(Float, nullable=False)
+    first_at = Column(DateTime, nullable=False)  # Momento do preço de abertura
+    last_at = Column(DateTime, nullable=False)  # Momento do preço de fechamento
+    __table_args__ = (
+        UniqueConstraint('crypto', 'interval', 'bucket_start', name='uq_price_candle_bucket'),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True, index=True)
@@ -68,17 +111,71 @@ class Notification(Base):
     crypto_type = Column(Enum(CryptoType), nullable=False)
     notification_type = Column(Enum(NotificationType), nullable=False)
     threshold_value = Column(Float, nullable=False)
+    hysteresis = Column(Float, default=0.0, server_default=text("0"), nullable=False)
+    cooldown_minutes = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    is_triggered = Column(Boolean, default=False, server_default=text("0"), nullable=False)
+    last_triggered_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="notifications")
+    __table_args__ = (
+        Index('idx_notification_user', 'user_id', 'id'),
+        # Carga do índice de notificações e faixas de id dos shards
+        Index('idx_notification_active', 'is_active', 'id'),
+    )
+
+class NotificationChange(Base):
+    """Alterações de notificações (criação, ativação/desativação, remoção).
+
+    Os índices em memória de todos os processos aplicam a cada tick as
+    entradas posteriores à última que viram.
+    """
+    __tablename__ = "notification_changes"
+    id = Column(Integer, primary_key=True)
+    notification_id = Column(Integer, nullable=False)  # Sem chave estrangeira: a notificação pode ter sido removida
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (
+        Index('idx_notification_change_changed_at', 'changed_at'),
+    )
+
+class PrincipalChange(Base):
+    """Usuários alterados ou desativados (e-mail do token).
+
+    Os caches de principal de todos os processos descartam essas entradas;
+    registros mais antigos que o TTL do cache não são mais necessários.
+    """
+    __tablename__ = "principal_changes"
+    id = Column(Integer, primary_key=True)
+    email = Column(String(100), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (
+        Index('idx_principal_change_changed_at', 'changed_at'),
+    )
 
 class NotificationLog(Base):
     __tablename__ = "notification_logs"
     id = Column(Integer, primary_key=True, index=True)
     notification_id = Column(Integer, ForeignKey("notifications.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))  # Dono da notificação (evita o join na listagem)
     crypto_type = Column(Enum(CryptoType), nullable=False)
     current_price_usd = Column(Float, nullable=False)
     current_price_brl = Column(Float, nullable=False)
     threshold_value = Column(Float, nullable=False)
     triggered_at = Column(DateTime, default=datetime.utcnow)
-    notification = relationship("Notification")
\ No newline at end of file
+    notification = relationship("Notification")
+    __table_args__ = (
+        Index('idx_notification_log_notification_triggered', 'notification_id', 'triggered_at'),
+        Index('idx_notification_log_triggered_at', 'triggered_at'),
+        Index('idx_notification_log_user_triggered', 'user_id', 'triggered_at', 'id'),
+    )
+
+class ServiceLease(Base):
+    """Lease de liderança de uma tarefa em background entre workers"""
+    __tablename__ = "service_leases"
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    payload = Column(Text, nullable=True)  # Últimos resultados publicados pelo líder (lista JSON)
+    payload_at = Column(DateTime, nullable=True)
+    tick_sequence = Column(Integer, nullable=False, default=0, server_default="0")  # Sequência do último resultado publicado
+    generation = Column(Integer, nullable=False, default=0, server_default="0")  # Incrementado a cada troca de líder
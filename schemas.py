@@ -1,9 +1,10 @@
-from pydantic import BaseModel, validator
-from typing_extensions import Annotated
+from pydantic import BaseModel, Field, validator
+from typing_extensions import Annotated, TypedDict
 from pydantic.types import StringConstraints
 from datetime import datetime
+from typing import Optional
 from enum import Enum
-from models import AddressType, CryptoType, NotificationType
+from models import AddressType, CryptoType, NotificationType, CandleInterval
 
 class UserCreate(BaseModel):
     name: Annotated[str, StringConstraints(min_length=1, max_length=100)]
@@ -52,6 +53,15 @@ class TransactionCreate(BaseModel):
     tx_hash: Annotated[str, StringConstraints(min_length=1, max_length=100)]
     amount: float
 
+class BulkTransactionError(BaseModel):
+    index: int
+    tx_hash: Optional[str] = None
+    detail: str
+
+class BulkTransactionResponse(BaseModel):
+    inserted: int
+    errors: list[BulkTransactionError]
+
 class TransactionResponse(BaseModel):
     id: int
     tx_hash: str
@@ -66,6 +76,29 @@ class BalanceResponse(BaseModel):
     balance_brl: float
     balance_crypto: float
     crypto_type: str
+    at: Optional[datetime] = None
+    price_timestamp: Optional[datetime] = None
+
+class PortfolioAddressBalance(BaseModel):
+    id: int
+    address: str
+    crypto_type: str
+    balance_crypto: float
+    balance_usd: float
+    balance_brl: float
+
+class PortfolioAssetTotal(BaseModel):
+    crypto_type: str
+    address_count: int
+    balance_crypto: float
+    balance_usd: float
+    balance_brl: float
+
+class PortfolioResponse(BaseModel):
+    addresses: list[PortfolioAddressBalance]
+    assets: list[PortfolioAssetTotal]
+    total_usd: float
+    total_brl: float
 
 class PriceResponse(BaseModel):
     crypto: str
@@ -75,16 +108,37 @@ class PriceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PriceCandleResponse(BaseModel):
+    crypto: CryptoType
+    interval: CandleInterval
+    bucket_start: datetime
+    open_usd: float
+    high_usd: float
+    low_usd: float
+    close_usd: float
+    open_brl: float
+    high_brl: float
+    low_brl: float
+    close_brl: float
+    class Config:
+        from_attributes = True
+
 class NotificationCreate(BaseModel):
     crypto_type: CryptoType
     notification_type: NotificationType
     threshold_value: float
+    hysteresis: Annotated[float, Field(ge=0)] = 0.0
+    cooldown_minutes: Annotated[int, Field(ge=0)] = 0
 
 class NotificationResponse(BaseModel):
     id: int
     crypto_type: str
     notification_type: str
     threshold_value: float
+    hysteresis: float
+    cooldown_minutes: int
+    is_triggered: bool
+    last_triggered_at: Optional[datetime] = None
     is_active: bool
     created_at: datetime
     class Config:
@@ -98,4 +152,39 @@ class NotificationLogResponse(BaseModel):
     threshold_value: float
     triggered_at: datetime
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Linhas das listagens, validadas em lote por services/serialization.py.
+# Mesmos campos (e ordem) dos modelos de resposta correspondentes.
+
+class AddressRow(TypedDict):
+    id: int
+    address: str
+    type: AddressType
+    balance: float
+
+class TransactionRow(TypedDict):
+    id: int
+    tx_hash: str
+    amount: float
+    timestamp: datetime
+
+class NotificationRow(TypedDict):
+    id: int
+    crypto_type: str
+    notification_type: str
+    threshold_value: float
+    hysteresis: float
+    cooldown_minutes: int
+    is_triggered: bool
+    last_triggered_at: Optional[datetime]
+    is_active: bool
+    created_at: datetime
+
+class NotificationLogRow(TypedDict):
+    id: int
+    crypto_type: str
+    current_price_usd: float
+    current_price_brl: float
+    threshold_value: float
+    triggered_at: datetime
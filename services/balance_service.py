@@ -0,0 +1,55 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import Address, Transaction, BalanceCheckpoint
+from config import BALANCE_CHECKPOINT_INTERVAL
+from dependencies import SessionLocal
+import structlog
+
+logger = structlog.get_logger()
+
+def record_checkpoints(db: Session, increments: dict, interval: int = BALANCE_CHECKPOINT_INTERVAL):
+    """Gravar checkpoints para endereços cujo contador cruzou um múltiplo do intervalo.
+
+    Chamado após aplicar increments ({address_id: nº de transações}); o
+    checkpoint fica na transação mais recente do endereço com o saldo total.
+    """
+    rows = db.query(Address.id, Address.transaction_count, Address.balance).filter(Address.id.in_(increments))
+    for address_id, transaction_count, balance in rows:
+        if transaction_count // interval == (transaction_count - increments[address_id]) // interval:
+            continue
+        transaction_id, timestamp = db.query(Transaction.id, Transaction.timestamp).filter(
+            Transaction.address_id == address_id
+        ).order_by(Transaction.timestamp.desc(), Transaction.id.desc()).first()
+        db.add(BalanceCheckpoint(address_id=address_id, transaction_id=transaction_id, timestamp=timestamp, balance=balance))
+
+def backfill_checkpoints(db: Session, interval: int = BALANCE_CHECKPOINT_INTERVAL, batch_size: int = 10000):
+    """Recriar os checkpoints de todos os endereços a partir das transações existentes"""
+    total = 0
+    address_ids = [address_id for (address_id,) in db.query(Address.id).order_by(Address.id)]
+    for address_id in address_ids:
+        db.query(BalanceCheckpoint).filter(BalanceCheckpoint.address_id == address_id).delete(synchronize_session=False)
+        running = 0.0
+        count = 0
+        checkpoints = []
+        rows = db.query(Transaction.id, Transaction.timestamp, Transaction.amount).filter(
+            Transaction.address_id == address_id
+        ).order_by(Transaction.timestamp, Transaction.id).yield_per(batch_size)
+        for transaction_id, timestamp, amount in rows:
+            running += amount
+            count += 1
+            if count % interval == 0:
+                checkpoints.append({"address_id": address_id, "transaction_id": transaction_id, "timestamp": timestamp, "balance": running})
+        if checkpoints:
+            db.execute(insert(BalanceCheckpoint), checkpoints)
+        db.query(Address).filter(Address.id == address_id).update({Address.transaction_count: count}, synchronize_session=False)
+        db.commit()
+        total += len(checkpoints)
+    logger.info(f"📌 {total} checkpoint(s) de saldo recriado(s) para {len(address_ids)} endereço(s)")
+    return total
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        backfill_checkpoints(session)
+    finally:
+        session.close()
\ No newline at end of file
@@ -0,0 +1,143 @@
+from fastapi import Request, HTTPException
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from models import Address, Transaction
+from schemas import TransactionCreate
+from services.balance_service import record_checkpoints
+import json
+import structlog
+
+logger = structlog.get_logger()
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def _parse_item(index, raw):
+    """Validar um item do lote, retornando (índice, transação ou erro)"""
+    try:
+        return index, TransactionCreate.model_validate(raw), None
+    except ValidationError as e:
+        error = e.errors()[0]
+        tx_hash = raw.get("tx_hash") if isinstance(raw, dict) else None
+        return index, None, {"index": index, "tx_hash": tx_hash, "detail": f"{'.'.join(map(str, error['loc']))}: {error['msg']}"}
+
+async def iter_transaction_chunks(request: Request, chunk_size: int):
+    """Ler o corpo como array JSON ou NDJSON em blocos de até chunk_size itens"""
+    chunk = []
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append(_parse_item(index, json.loads(line)))
+                except ValueError:
+                    chunk.append((index, None, {"index": index, "tx_hash": None, "detail": "JSON inválido"}))
+                index += 1
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if buffer.strip():
+            try:
+                chunk.append(_parse_item(index, json.loads(buffer)))
+            except ValueError:
+                chunk.append((index, None, {"index": index, "tx_hash": None, "detail": "JSON inválido"}))
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Corpo da requisição inválido")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Esperado um array JSON de transações")
+        for index, raw in enumerate(items):
+            chunk.append(_parse_item(index, raw))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def _apply_chunk(db: Session, rows):
+    """Inserir as transações e aplicar um delta de saldo e contagem por endereço"""
+    deltas = {}
+    counts = {}
+    for row in rows:
+        deltas[row["address_id"]] = deltas.get(row["address_id"], 0.0) + row["amount"]
+        counts[row["address_id"]] = counts.get(row["address_id"], 0) + 1
+    db.execute(insert(Transaction), rows)
+    addresses = Address.__table__
+    db.execute(
+        update(addresses)
+        .where(addresses.c.id == bindparam("_address_id"))
+        .values(
+            balance=addresses.c.balance + bindparam("_delta"),
+            transaction_count=addresses.c.transaction_count + bindparam("_count")
+        ),
+        [{"_address_id": address_id, "_delta": delta, "_count": counts[address_id]} for address_id, delta in deltas.items()]
+    )
+    record_checkpoints(db, counts)
+
+def ingest_chunk(db: Session, chunk, user_id: int, ownership: dict, result: dict):
+    """Processar um bloco de transações do lote.
+
+    A posse de cada address_id é verificada uma única vez por requisição
+    (cache em ownership); tx_hash duplicados são reportados por item.
+    """
+    errors = result["errors"]
+    valid = []
+    for index, transaction, error in chunk:
+        if error is not None:
+            errors.append(error)
+        else:
+            valid.append((index, transaction))
+
+    unknown = {transaction.address_id for _, transaction in valid} - ownership.keys()
+    if unknown:
+        owned = {
+            address_id for (address_id,) in
+            db.query(Address.id).filter(Address.id.in_(unknown), Address.user_id == user_id)
+        }
+        for address_id in unknown:
+            ownership[address_id] = address_id in owned
+
+    hashes = {transaction.tx_hash for _, transaction in valid}
+    existing = {
+        tx_hash for (tx_hash,) in
+        db.query(Transaction.tx_hash).filter(Transaction.tx_hash.in_(hashes))
+    } if hashes else set()
+
+    accepted = []
+    seen = set()
+    for index, transaction in valid:
+        if not ownership[transaction.address_id]:
+            errors.append({"index": index, "tx_hash": transaction.tx_hash, "detail": "Endereço não encontrado"})
+        elif transaction.tx_hash in existing or transaction.tx_hash in seen:
+            errors.append({"index": index, "tx_hash": transaction.tx_hash, "detail": "tx_hash duplicado"})
+        else:
+            seen.add(transaction.tx_hash)
+            accepted.append((index, transaction.model_dump()))
+    if not accepted:
+        return
+
+    try:
+        _apply_chunk(db, [row for _, row in accepted])
+        db.commit()
+        result["inserted"] += len(accepted)
+    except IntegrityError:
+        # Inserção concorrente com o mesmo tx_hash: repetir item a item
+        db.rollback()
+        logger.warning(f"⚠️ Conflito ao importar bloco de {len(accepted)} transações, repetindo item a item")
+        for index, row in accepted:
+            try:
+                with db.begin_nested():
+                    _apply_chunk(db, [row])
+                result["inserted"] += 1
+            except IntegrityError:
+                errors.append({"index": index, "tx_hash": row["tx_hash"], "detail": "tx_hash duplicado"})
+        db.commit()
@@ -0,0 +1,98 @@
+from config import STREAM_QUEUE_SIZE
+from services.metrics import STREAM_SUBSCRIBERS, STREAM_DROPPED
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+DROPPED = object()  # Sentinela entregue ao assinante descartado por lentidão
+
+class Subscription:
+    """Fila limitada de um assinante de um tópico (opcionalmente filtrado por chave)"""
+    __slots__ = ("topic", "key", "queue")
+
+    def __init__(self, topic: str, key, maxsize: int):
+        self.topic = topic
+        self.key = key
+        self.queue = asyncio.Queue(maxsize)
+
+class EventBus:
+    """Fan-out assíncrono em processo para os streams (SSE).
+
+    publish pode ser chamado de qualquer thread; a entrega acontece no
+    event loop. Cada assinante tem uma fila limitada: se ela encher, o
+    assinante é descartado (recebe DROPPED) em vez de acumular memória ou
+    atrasar os demais.
+    """
+
+    def __init__(self, maxsize: int = STREAM_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._loop = None
+        self._topics = {}  # tópico -> {chave: set(Subscription)}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribers(self, topic: str):
+        return sum(len(subscriptions) for subscriptions in self._topics.get(topic, {}).values())
+
+    def has_subscribers(self, topic: str):
+        return bool(self._topics.get(topic))
+
+    def subscribe(self, topic: str, key=None):
+        """Registrar um assinante (deve ser chamado no event loop)"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(topic, key, self.maxsize)
+        self._topics.setdefault(topic, {}).setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        keys = self._topics.get(subscription.topic, {})
+        subscriptions = keys.get(subscription.key)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del keys[subscription.key]
+        if not keys:
+            self._topics.pop(subscription.topic, None)
+
+    def publish(self, topic: str, message, key=None):
+        """Enviar message aos assinantes do tópico (key=None: todos; senão, os daquela chave)"""
+        if self._loop is None or not self._topics.get(topic):
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._dispatch(topic, message, key)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, topic, message, key)
+
+    def _dispatch(self, topic: str, message, key):
+        keys = self._topics.get(topic, {})
+        if key is None:
+            targets = [subscription for subscriptions in keys.values() for subscription in subscriptions]
+        else:
+            targets = list(keys.get(key, ()))
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        """Descartar um assinante lento: esvaziar a fila e entregar DROPPED"""
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(DROPPED)
+        STREAM_DROPPED.labels(subscription.topic).inc()
+        logger.warning(f"⚠️ Assinante lento descartado do stream {subscription.topic}")
+
+event_bus = EventBus()
+
+for _topic in ("prices", "notifications"):
+    STREAM_SUBSCRIBERS.labels(_topic).set_function(lambda topic=_topic: event_bus.subscribers(topic))
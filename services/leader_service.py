@@ -0,0 +1,160 @@
+from sqlalchemy import update, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from models import ServiceLease
+from config import PRICE_LEADER_LEASE_SECONDS, PRICE_LEADER_RECENT_TICKS
+import json
+import os
+import socket
+import uuid
+import structlog
+
+logger = structlog.get_logger()
+
+class LeaseLost(Exception):
+    """O lease mudou de dono (ou de geração) desde que este worker o assumiu"""
+
+def check_lease(connection, name: str, holder: str, generation: int):
+    """Confirmar, na transação corrente, que o lease ainda é (holder, generation).
+
+    A linha fica bloqueada (FOR UPDATE) até o commit: outro worker só
+    consegue assumir o lease depois que a escrita protegida terminar.
+    """
+    leases = ServiceLease.__table__
+    owned = connection.execute(
+        select(leases.c.name)
+        .where(leases.c.name == name, leases.c.holder == holder, leases.c.generation == generation)
+        .with_for_update()
+    ).first()
+    if owned is None:
+        raise LeaseLost(f"lease {name} não pertence mais a {holder} (geração {generation})")
+
+class LeaderLease:
+    """Eleição de líder entre workers por uma linha de lease no banco.
+
+    O líder renova o lease a cada heartbeat; se o processo morrer, outro
+    worker assume quando o lease expira. A mesma linha serve de canal para o
+    líder publicar seus últimos resultados, numerados em sequência, aos
+    demais workers (leitura por chave primária, sem consultar as tabelas de
+    dados).
+
+    Cada troca de dono incrementa a geração do lease; as escritas do líder
+    chamam fence() na mesma transação para não gravar depois de perder o
+    lease (um líder pausado que ainda não percebeu a troca).
+    """
+
+    def __init__(self, name: str, ttl_seconds: int, keep: int = PRICE_LEADER_RECENT_TICKS):
+        self.name = name
+        self.keep = keep
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.generation = None
+
+    def try_acquire(self, db: Session):
+        """Assumir ou renovar o lease; retorna True se este worker é o líder"""
+        leases = ServiceLease.__table__
+        now = datetime.utcnow()
+        # Renovação mantém a geração; assumir um lease expirado a incrementa
+        renewed = db.execute(
+            update(leases)
+            .where(leases.c.name == self.name, leases.c.holder == self.holder)
+            .values(expires_at=now + self.ttl)
+        ).rowcount == 1
+        acquired = renewed or db.execute(
+            update(leases)
+            .where(leases.c.name == self.name, leases.c.holder != self.holder, leases.c.expires_at < now)
+            .values(holder=self.holder, expires_at=now + self.ttl, generation=leases.c.generation + 1)
+        ).rowcount == 1
+        if not acquired and db.query(ServiceLease.name).filter(ServiceLease.name == self.name).first() is None:
+            try:
+                db.execute(insert(leases).values(name=self.name, holder=self.holder, expires_at=now + self.ttl, generation=1))
+                acquired = True
+            except IntegrityError:
+                # Outro worker criou o lease ao mesmo tempo
+                db.rollback()
+        if acquired:
+            self.generation = db.query(ServiceLease.generation).filter(ServiceLease.name == self.name).scalar()
+        db.commit()
+        if acquired != self.is_leader:
+            if acquired:
+                logger.info(f"👑 Worker {self.holder} assumiu a liderança de {self.name}")
+            else:
+                logger.warning(f"⚠️ Worker {self.holder} perdeu a liderança de {self.name}")
+        self.is_leader = acquired
+        return acquired
+
+    def fence(self, db: Session):
+        """Abortar (LeaseLost) se o lease mudou desde o último heartbeat deste worker"""
+        if self.generation is None:
+            raise LeaseLost(f"{self.holder} nunca assumiu o lease {self.name}")
+        check_lease(db, self.name, self.holder, self.generation)
+
+    def token(self):
+        """(nome, dono, geração) para verificar o lease em outro processo (check_lease)"""
+        return self.name, self.holder, self.generation
+
+    def release(self, db: Session):
+        """Liberar o lease imediatamente (encerramento limpo acelera o failover)"""
+        if not self.is_leader:
+            return
+        leases = ServiceLease.__table__
+        db.execute(
+            update(leases)
+            .where(leases.c.name == self.name, leases.c.holder == self.holder)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.commit()
+        self.is_leader = False
+
+    def publish(self, db: Session, payload: dict, published_at: datetime):
+        """Acrescentar um resultado aos publicados na linha do lease.
+
+        Executado na transação da escrita que o produziu, sem commit: a linha
+        é bloqueada e a posse conferida como em fence() (LeaseLost se o lease
+        mudou). Apenas os últimos keep resultados são mantidos.
+        """
+        leases = ServiceLease.__table__
+        row = db.execute(
+            select(leases.c.payload, leases.c.tick_sequence)
+            .where(leases.c.name == self.name, leases.c.holder == self.holder, leases.c.generation == self.generation)
+            .with_for_update()
+        ).first()
+        if row is None:
+            raise LeaseLost(f"lease {self.name} não pertence mais a {self.holder} (geração {self.generation})")
+        recent = json.loads(row.payload) if row.payload else []
+        if not isinstance(recent, list):
+            recent = []  # Formato anterior: um único resultado
+        sequence = row.tick_sequence + 1
+        recent.append({"sequence": sequence, "published_at": published_at.isoformat(), "payload": payload})
+        db.execute(
+            update(leases)
+            .where(leases.c.name == self.name)
+            .values(payload=json.dumps(recent[-self.keep:]), payload_at=published_at, tick_sequence=sequence)
+        )
+
+    def published_at(self, db: Session):
+        """Horário do último resultado publicado (ou None)"""
+        return db.query(ServiceLease.payload_at).filter(ServiceLease.name == self.name).scalar()
+
+    def read_since(self, db: Session, sequence: int):
+        """Resultados publicados depois de sequence.
+
+        Retorna None se nada mudou (a lista só é lida quando a sequência
+        avança) ou (última sequência, [(sequência, publicado_em, payload)]).
+        """
+        row = db.query(ServiceLease.tick_sequence, ServiceLease.payload).filter(
+            ServiceLease.name == self.name, ServiceLease.tick_sequence != sequence
+        ).first()
+        if row is None:
+            return None
+        recent = json.loads(row.payload) if row.payload else []
+        if not isinstance(recent, list):
+            recent = []
+        return row.tick_sequence, [
+            (item["sequence"], datetime.fromisoformat(item["published_at"]), item["payload"])
+            for item in recent if item["sequence"] > sequence
+        ]
+
+price_leader = LeaderLease("price_updater", PRICE_LEADER_LEASE_SECONDS)
@@ -0,0 +1,134 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from models import NotificationLog
+from config import NOTIFICATION_LOG_HOT_MONTHS, NOTIFICATION_LOG_ARCHIVE_DIR
+from dependencies import SessionLocal
+import glob
+import gzip
+import itertools
+import json
+import os
+import structlog
+
+logger = structlog.get_logger()
+
+ARCHIVE_PREFIX = "notification_logs-"
+ARCHIVE_SUFFIX = ".ndjson.gz"
+
+def month_start(timestamp: datetime):
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(start: datetime, months: int):
+    """Somar (ou subtrair) meses a um início de mês"""
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+def _archive_path(directory: str, month: datetime):
+    """Caminho livre para o arquivo do mês (sufixo .N se o mês já foi arquivado antes)"""
+    base = os.path.join(directory, f"{ARCHIVE_PREFIX}{month:%Y-%m}")
+    path = base + ARCHIVE_SUFFIX
+    part = 1
+    while os.path.exists(path):
+        path = f"{base}.{part}{ARCHIVE_SUFFIX}"
+        part += 1
+    return path
+
+def _archive_month(db: Session, month: datetime, directory: str, batch_size: int):
+    """Gravar os logs de um mês em NDJSON compactado e removê-los da tabela quente"""
+    end = add_months(month, 1)
+    in_month = (NotificationLog.triggered_at >= month, NotificationLog.triggered_at < end)
+    rows = db.query(
+        NotificationLog.id, NotificationLog.notification_id, NotificationLog.user_id, NotificationLog.crypto_type,
+        NotificationLog.current_price_usd, NotificationLog.current_price_brl,
+        NotificationLog.threshold_value, NotificationLog.triggered_at
+    ).filter(*in_month).order_by(NotificationLog.triggered_at, NotificationLog.id).yield_per(batch_size)
+
+    path = _archive_path(directory, month)
+    temp_path = path + ".tmp"
+    count = 0
+    with gzip.open(temp_path, "wt", encoding="utf-8") as archive:
+        for log_id, notification_id, user_id, crypto_type, price_usd, price_brl, threshold, triggered_at in rows:
+            archive.write(json.dumps({
+                "id": log_id,
+                "notification_id": notification_id,
+                "user_id": user_id,
+                "crypto_type": crypto_type.value,
+                "current_price_usd": price_usd,
+                "current_price_brl": price_brl,
+                "threshold_value": threshold,
+                "triggered_at": triggered_at.isoformat()
+            }) + "\n")
+            count += 1
+    if count == 0:
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, path)
+
+    # Só remove da tabela quente depois que o arquivo está completo no disco
+    while True:
+        ids = [log_id for (log_id,) in db.query(NotificationLog.id).filter(*in_month).limit(batch_size)]
+        if not ids:
+            break
+        db.query(NotificationLog).filter(NotificationLog.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+    logger.info(f"📦 {count} log(s) de {month:%Y-%m} arquivado(s) em {path}")
+    return count
+
+def archive_notification_logs(db: Session, hot_months: int = NOTIFICATION_LOG_HOT_MONTHS,
+                              directory: str = NOTIFICATION_LOG_ARCHIVE_DIR, batch_size: int = 10000):
+    """Arquivar os meses anteriores aos hot_months mais recentes (mês corrente incluso)"""
+    cutoff = add_months(month_start(datetime.utcnow()), -(max(hot_months, 1) - 1))
+    oldest = db.query(NotificationLog.triggered_at).filter(
+        NotificationLog.triggered_at < cutoff
+    ).order_by(NotificationLog.triggered_at).first()
+    if oldest is None:
+        logger.info(f"✅ Nenhum log de notificação anterior a {cutoff.date()} para arquivar")
+        return 0
+
+    os.makedirs(directory, exist_ok=True)
+    archived = 0
+    month = month_start(oldest[0])
+    while month < cutoff:
+        archived += _archive_month(db, month, directory, batch_size)
+        month = add_months(month, 1)
+    return archived
+
+def _archived_months(directory: str):
+    """Arquivos agrupados por mês, do mais recente para o mais antigo"""
+    months = {}
+    for path in glob.glob(os.path.join(directory, f"{ARCHIVE_PREFIX}*{ARCHIVE_SUFFIX}")):
+        name = os.path.basename(path)[len(ARCHIVE_PREFIX):]
+        months.setdefault(datetime.strptime(name[:7], "%Y-%m"), []).append(path)
+    return sorted(months.items(), reverse=True)
+
+def iter_archived_logs(user_id: int, before=None, directory: str = NOTIFICATION_LOG_ARCHIVE_DIR):
+    """Percorrer os logs arquivados de um usuário do mais recente para o mais antigo.
+
+    before é um cursor (triggered_at, id); apenas registros anteriores a ele
+    são retornados. Os arquivos são lidos um mês por vez.
+    """
+    for month, paths in _archived_months(directory):
+        if before is not None and month > before[0]:
+            continue
+        logs = []
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    log = json.loads(line)
+                    if log["user_id"] != user_id:
+                        continue
+                    log["triggered_at"] = datetime.fromisoformat(log["triggered_at"])
+                    if before is None or (log["triggered_at"], log["id"]) < before:
+                        logs.append(log)
+        logs.sort(key=lambda log: (log["triggered_at"], log["id"]), reverse=True)
+        yield from logs
+
+def read_archived_logs(user_id: int, limit: int, before=None):
+    return list(itertools.islice(iter_archived_logs(user_id, before), limit))
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        archive_notification_logs(session)
+    finally:
+        session.close()
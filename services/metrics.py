@@ -0,0 +1,133 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from contextvars import ContextVar
+import time
+
+# Buckets em segundos: de 1 ms (cache) a 10 s (bcrypt sob carga, ticks lentos)
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latência das requisições por rota",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Consultas SQL executadas por requisição",
+    ["method", "route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obter uma conexão do pool",
+    ["pool"], buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 30)
+)
+POOL_CONNECTIONS = Gauge("db_pool_connections", "Conexões do pool por estado", ["pool", "state"])
+READ_SESSIONS = Counter(
+    "db_read_sessions_total", "Sessões das rotas de leitura por destino (réplica ou primário)", ["target"]
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total", "Consultas compartilhadas: executadas, coalescidas (em voo) ou do micro-TTL",
+    ["name", "result"]
+)
+TICK_DURATION = Histogram(
+    "price_tick_stage_duration_seconds", "Duração de cada etapa do tick de preços",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+PRICE_TICKS_RECEIVED = Counter(
+    "price_ticks_received_total", "Ticks recebidos da fonte de preços (antes da agregação)", ["source"]
+)
+STREAM_SUBSCRIBERS = Gauge("stream_subscribers", "Assinantes conectados aos streams SSE", ["topic"])
+STREAM_DROPPED = Counter("stream_subscribers_dropped_total", "Assinantes descartados por não acompanharem o stream", ["topic"])
+NOTIFICATIONS_TRIGGERED = Counter(
+    "notifications_triggered_total", "Notificações disparadas por criptomoeda", ["crypto"]
+)
+NOTIFICATION_SHARD_DURATION = Histogram(
+    "notification_shard_stage_duration_seconds", "Duração de cada etapa da avaliação por shard de notificações",
+    ["shard", "stage"], buckets=LATENCY_BUCKETS
+)
+
+# Contador de consultas da requisição corrente; é uma lista para que threads
+# do threadpool (que recebem uma cópia do contexto) incrementem o mesmo objeto
+_request_queries = ContextVar("request_queries", default=None)
+
+class _TimedCheckout:
+    """Mede o tempo gasto em _do_get, incluindo a espera por conexão livre"""
+    metrics_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+# Engines instrumentados, por nome do pool (sync, async, read, async_read)
+_engines = {}
+
+def instrument_engine(engine, name: str):
+    """Registrar contagem de consultas e gauges do pool de um engine"""
+    event.listen(engine, "before_cursor_execute", _count_query)
+    pool = engine.pool
+    pool.metrics_name = name
+    _engines[name] = engine
+    POOL_CONNECTIONS.labels(name, "checked_out").set_function(lambda: pool.checkedout())
+    POOL_CONNECTIONS.labels(name, "idle").set_function(lambda: pool.checkedin())
+    POOL_CONNECTIONS.labels(name, "overflow").set_function(lambda: max(pool.overflow(), 0))
+
+def pool_stats():
+    """Tamanho e conexões em uso/ociosas/overflow de cada pool instrumentado"""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0)
+        }
+    return stats
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+def observe_stage(stage: str, seconds: float):
+    TICK_DURATION.labels(stage).observe(seconds)
+
+class MetricsMiddleware:
+    """Middleware ASGI de latência e consultas por rota (template, não o caminho)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        counter = [0]
+        token = _request_queries.set(counter)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route, status[0]).observe(time.perf_counter() - start)
+            REQUEST_QUERIES.labels(method, route).observe(counter[0])
+
+def render():
+    """Métricas no formato texto do Prometheus"""
+    return generate_latest(), CONTENT_TYPE_LATEST
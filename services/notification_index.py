@@ -0,0 +1,284 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models import Notification, NotificationChange, CryptoType, NotificationType
+from config import NOTIFICATION_INDEX_RELOAD_SECONDS
+from datetime import datetime, timedelta
+import bisect
+import threading
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+EQUAL_TOLERANCE = 0.01  # Mesma tolerância usada para o operador ==
+# Entradas de notification_changes relidas a cada sincronização: ids autoincremento
+# de transações concorrentes podem ser confirmados fora de ordem
+CHANGE_LOOKBACK = 100
+
+class ThresholdBucket:
+    """Limiares ordenados de um par (CryptoType, NotificationType)"""
+    __slots__ = ("thresholds", "ids")
+
+    def __init__(self):
+        self.thresholds = []
+        self.ids = []
+
+    def insert(self, threshold: float, notification_id: int):
+        pos = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(pos, threshold)
+        self.ids.insert(pos, notification_id)
+
+    def remove(self, threshold: float, notification_id: int):
+        lo = bisect.bisect_left(self.thresholds, threshold)
+        hi = bisect.bisect_right(self.thresholds, threshold)
+        for pos in range(lo, hi):
+            if self.ids[pos] == notification_id:
+                del self.thresholds[pos]
+                del self.ids[pos]
+                return True
+        return False
+
+    def matching_range(self, notification_type: NotificationType, price: float):
+        """Intervalo [início, fim) dos limiares atingidos pelo preço"""
+        if notification_type == NotificationType.GREATER_EQUAL:
+            return 0, bisect.bisect_right(self.thresholds, price)
+        if notification_type == NotificationType.GREATER:
+            return 0, bisect.bisect_left(self.thresholds, price)
+        if notification_type == NotificationType.LESS_EQUAL:
+            return bisect.bisect_left(self.thresholds, price), len(self.thresholds)
+        if notification_type == NotificationType.LESS:
+            return bisect.bisect_right(self.thresholds, price), len(self.thresholds)
+        # EQUAL: |preço - limiar| < tolerância
+        return (bisect.bisect_right(self.thresholds, price - EQUAL_TOLERANCE),
+                bisect.bisect_left(self.thresholds, price + EQUAL_TOLERANCE))
+
+class AlertState:
+    """Estado de disparo de uma notificação (borda, histerese e cooldown)"""
+    __slots__ = ("hysteresis", "cooldown", "triggered", "last_triggered_at")
+
+    def __init__(self, hysteresis, cooldown_minutes, triggered, last_triggered_at):
+        self.hysteresis = hysteresis or 0.0
+        self.cooldown = timedelta(minutes=cooldown_minutes or 0)
+        self.triggered = bool(triggered)
+        self.last_triggered_at = last_triggered_at
+
+def rearmed(notification_type: NotificationType, threshold: float, hysteresis: float, price: float):
+    """Se o preço se afastou do limiar o suficiente (além da histerese) para rearmar o alerta"""
+    if notification_type == NotificationType.GREATER_EQUAL:
+        return price < threshold - hysteresis
+    if notification_type == NotificationType.GREATER:
+        return price <= threshold - hysteresis
+    if notification_type == NotificationType.LESS_EQUAL:
+        return price > threshold + hysteresis
+    if notification_type == NotificationType.LESS:
+        return price >= threshold + hysteresis
+    return abs(price - threshold) >= EQUAL_TOLERANCE + hysteresis
+
+class NotificationIndex:
+    """Índice em memória das notificações ativas por criptomoeda e operador.
+
+    Cada tick de preço encontra as notificações atingidas com busca binária
+    (O(log n + k)) em vez de varrer todas as notificações ativas. A cada tick
+    o índice aplica as entradas novas de notification_changes, gravadas pelo
+    crud.py de qualquer processo na mesma transação da alteração; a recarga
+    completa a cada NOTIFICATION_INDEX_RELOAD_SECONDS é apenas uma garantia
+    adicional.
+
+    Também guarda o último estado avaliado de cada notificação: um alerta só
+    dispara na transição falso→verdadeiro e só é rearmado quando o preço volta
+    além do limiar mais a histerese.
+
+    id_range=(início, fim) restringe o índice a um intervalo de ids (fim=None:
+    sem limite superior), usado pelos shards de notification_shards.
+    """
+
+    def __init__(self, id_range=(None, None)):
+        self.id_range = id_range
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._entries = {}
+        self._states = {}
+        self._triggered = {}
+        self._change_id = 0
+        self._applied_changes = set()
+        self._loaded_at = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self):
+        """Forçar recarga completa na próxima verificação"""
+        with self._lock:
+            self._loaded_at = None
+
+    def set_range(self, id_range):
+        """Mudar o intervalo de ids do índice (força recarga completa)"""
+        if tuple(id_range) != tuple(self.id_range):
+            self.id_range = tuple(id_range)
+            self.invalidate()
+
+    def load(self, db: Session):
+        """Recarregar o índice completo a partir do banco"""
+        # Marca d'água lida antes das notificações: alterações concorrentes com
+        # a carga são reaplicadas (refresh é idempotente)
+        change_id = db.query(func.max(NotificationChange.id)).scalar() or 0
+        recent_changes = self._changes_query(db, change_id).all()
+        rows = self._query(db).yield_per(10000)
+
+        grouped = {}
+        entries = {}
+        states = {}
+        triggered = {}
+        for notification_id, crypto_type, notification_type, threshold, *state in rows:
+            grouped.setdefault((crypto_type, notification_type), []).append((threshold, notification_id))
+            entries[notification_id] = (crypto_type, notification_type, threshold)
+            states[notification_id] = AlertState(*state)
+            if states[notification_id].triggered:
+                triggered.setdefault(crypto_type, set()).add(notification_id)
+
+        buckets = {}
+        for key, pairs in grouped.items():
+            pairs.sort()
+            bucket = ThresholdBucket()
+            bucket.thresholds = [threshold for threshold, _ in pairs]
+            bucket.ids = [notification_id for _, notification_id in pairs]
+            buckets[key] = bucket
+
+        with self._lock:
+            self._buckets = buckets
+            self._entries = entries
+            self._states = states
+            self._triggered = triggered
+            self._change_id = change_id
+            self._applied_changes = {applied_id for applied_id, _ in recent_changes}
+            self._loaded_at = time.monotonic()
+        logger.info(f"📇 Índice de notificações carregado: {len(entries)} notificação(ões) ativa(s)")
+
+    def sync_changes(self, db: Session):
+        """Aplicar as alterações de notification_changes desde a última sincronização"""
+        changes = [
+            (change_id, notification_id) for change_id, notification_id in self._changes_query(db, self._change_id).all()
+            if change_id not in self._applied_changes
+        ]
+        if not changes:
+            return 0
+        self.refresh(db, {notification_id for _, notification_id in changes})
+        with self._lock:
+            self._change_id = max(self._change_id, max(change_id for change_id, _ in changes))
+            self._applied_changes.update(change_id for change_id, _ in changes)
+            self._applied_changes = {
+                change_id for change_id in self._applied_changes if change_id > self._change_id - CHANGE_LOOKBACK
+            }
+        return len(changes)
+
+    def refresh(self, db: Session, notification_ids):
+        """Recarregar do banco as notificações informadas (alteradas ou removidas)"""
+        notification_ids = [notification_id for notification_id in notification_ids if self._in_range(notification_id)]
+        if not notification_ids:
+            return
+        for notification_id in notification_ids:
+            self.discard(notification_id)
+        rows = self._query(db).filter(Notification.id.in_(notification_ids)).all()
+        with self._lock:
+            for notification_id, crypto_type, notification_type, threshold, *state in rows:
+                self._insert(notification_id, crypto_type, notification_type, threshold, AlertState(*state))
+
+    def ensure_fresh(self, db: Session):
+        """Carregar o índice se necessário ou apenas aplicar as alterações registradas"""
+        if not self.loaded or time.monotonic() - self._loaded_at >= NOTIFICATION_INDEX_RELOAD_SECONDS:
+            self.load(db)
+        else:
+            self.sync_changes(db)
+
+    def discard(self, notification_id: int):
+        with self._lock:
+            entry = self._entries.pop(notification_id, None)
+            self._states.pop(notification_id, None)
+            if entry is not None:
+                crypto_type, notification_type, threshold = entry
+                self._buckets[(crypto_type, notification_type)].remove(threshold, notification_id)
+                self._triggered.get(crypto_type, set()).discard(notification_id)
+
+    def evaluate(self, crypto_type: CryptoType, price: float, now: datetime):
+        """Avaliar as transições de estado das notificações de uma criptomoeda.
+
+        Retorna (disparadas, transições): disparadas são os ids que cruzaram o
+        limiar fora do cooldown; transições são os (id, is_triggered,
+        last_triggered_at) a persistir.
+        """
+        fired = []
+        transitions = []
+        with self._lock:
+            currently = self._triggered.setdefault(crypto_type, set())
+            matching = set()
+            for notification_type in NotificationType:
+                bucket = self._buckets.get((crypto_type, notification_type))
+                if bucket is None:
+                    continue
+                start, end = bucket.matching_range(notification_type, price)
+                for notification_id, threshold in zip(bucket.ids[start:end], bucket.thresholds[start:end]):
+                    matching.add(notification_id)
+                    if notification_id in currently:
+                        continue
+                    state = self._states[notification_id]
+                    state.triggered = True
+                    currently.add(notification_id)
+                    if state.last_triggered_at is None or now - state.last_triggered_at >= state.cooldown:
+                        state.last_triggered_at = now
+                        fired.append(notification_id)
+                    transitions.append((notification_id, True, state.last_triggered_at))
+
+            for notification_id in list(currently - matching):
+                _, notification_type, threshold = self._entries[notification_id]
+                state = self._states[notification_id]
+                if rearmed(notification_type, threshold, state.hysteresis, price):
+                    state.triggered = False
+                    currently.discard(notification_id)
+                    transitions.append((notification_id, False, state.last_triggered_at))
+        return fired, transitions
+
+    def _in_range(self, notification_id: int):
+        start, end = self.id_range
+        return (start is None or notification_id >= start) and (end is None or notification_id < end)
+
+    def _changes_query(self, db: Session, after_id: int):
+        """(id, notification_id) das alterações da faixa do índice, relendo as últimas CHANGE_LOOKBACK"""
+        query = db.query(NotificationChange.id, NotificationChange.notification_id).filter(
+            NotificationChange.id > after_id - CHANGE_LOOKBACK
+        )
+        start, end = self.id_range
+        if start is not None:
+            query = query.filter(NotificationChange.notification_id >= start)
+        if end is not None:
+            query = query.filter(NotificationChange.notification_id < end)
+        return query
+
+    def _query(self, db: Session):
+        query = _active_notifications(db)
+        start, end = self.id_range
+        if start is not None:
+            query = query.filter(Notification.id >= start)
+        if end is not None:
+            query = query.filter(Notification.id < end)
+        return query
+
+    def _insert(self, notification_id, crypto_type, notification_type, threshold, state: AlertState):
+        if notification_id in self._entries:
+            return
+        self._entries[notification_id] = (crypto_type, notification_type, threshold)
+        self._states[notification_id] = state
+        if state.triggered:
+            self._triggered.setdefault(crypto_type, set()).add(notification_id)
+        self._buckets.setdefault((crypto_type, notification_type), ThresholdBucket()).insert(threshold, notification_id)
+
+def _active_notifications(db: Session):
+    return db.query(
+        Notification.id, Notification.crypto_type, Notification.notification_type, Notification.threshold_value,
+        Notification.hysteresis, Notification.cooldown_minutes, Notification.is_triggered, Notification.last_triggered_at
+    ).filter(Notification.is_active == True)
+
+notification_index = NotificationIndex()
@@ -1,55 +1,119 @@
 from sqlalchemy.orm import Session
-from models import Notification, NotificationLog, CryptoType, NotificationType
+from datetime import datetime, timedelta
+from models import NotificationChange
+from config import NOTIFICATION_INDEX_RELOAD_SECONDS, NOTIFICATION_SHARD_INSERT_BATCH
+from services.notification_index import notification_index
+from services.notification_shards import notification_shards, persist_transitions, insert_logs
+from services.metrics import NOTIFICATIONS_TRIGGERED, NOTIFICATION_SHARD_DURATION, observe_stage
+from services.stream_service import notification_relay
+from services.leader_service import LeaseLost
 import structlog
+import time
 
 logger = structlog.get_logger()
 
-def check_notifications(db: Session, price_data: dict):
-    """Verificar e processar notificações em lotes"""
+def load_notification_state(db: Session):
+    """Montar do zero o estado em memória (índice ou shards) ao assumir a liderança.
+
+    Os seguidores não avaliam notificações e não mantêm índice; o estado
+    de quem já foi líder pode estar desatualizado.
+    """
+    notification_shards.invalidate()
+    if notification_shards.enabled:
+        return notification_shards.load(db)
+    notification_index.load(db)
+    return len(notification_index)
+
+_pruned_at = None
+
+def prune_notification_changes(db: Session):
+    """Remover de notification_changes as entradas já cobertas pela recarga completa dos índices.
+
+    Executado pelo líder no máximo uma vez a cada NOTIFICATION_INDEX_RELOAD_SECONDS.
+    """
+    global _pruned_at
+    if _pruned_at is not None and time.monotonic() - _pruned_at < NOTIFICATION_INDEX_RELOAD_SECONDS:
+        return
+    _pruned_at = time.monotonic()
+    before = datetime.utcnow() - timedelta(seconds=2 * NOTIFICATION_INDEX_RELOAD_SECONDS)
+    removed = db.query(NotificationChange).filter(NotificationChange.changed_at < before).delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        logger.info(f"🧹 {removed} alteração(ões) antiga(s) de notificações removida(s)")
+
+def check_notifications(db: Session, price_data: dict, lease=None):
+    """Verificar e processar notificações usando o índice de limiares.
+
+    Apenas cruzamentos de limiar (falso→verdadeiro) geram log; o estado de
+    cada notificação é persistido somente quando muda. Com lease, a posse é
+    conferida na transação que grava os logs.
+    """
     logger.info("🔍 Verificando notificações ativas...")
+    notification_relay.start(db)
+    if notification_shards.enabled:
+        return check_notifications_sharded(db, price_data, lease)
     try:
-        for crypto_type in [CryptoType.BTC, CryptoType.ETH]:
-            current_price = price_data["bitcoin" if crypto_type == CryptoType.BTC else "ethereum"]["usd"]
-            current_price_brl = price_data["bitcoin" if crypto_type == CryptoType.BTC else "ethereum"]["brl"]
-            
-            notifications = db.query(Notification).filter(
-                Notification.is_active == True,
-                Notification.crypto_type == crypto_type
-            ).yield_per(100).all()
-
-            triggered_logs = []
-            for notification in notifications:
-                triggered = False
-                if notification.notification_type == NotificationType.GREATER_EQUAL:
-                    triggered = current_price >= notification.threshold_value
-                elif notification.notification_type == NotificationType.LESS_EQUAL:
-                    triggered = current_price <= notification.threshold_value
-                elif notification.notification_type == NotificationType.GREATER:
-                    triggered = current_price > notification.threshold_value
-                elif notification.notification_type == NotificationType.LESS:
-                    triggered = current_price < notification.threshold_value
-                elif notification.notification_type == NotificationType.EQUAL:
-                    triggered = abs(current_price - notification.threshold_value) < 0.01
-                
-                if triggered:
-                    triggered_logs.append(NotificationLog(
-                        notification_id=notification.id,
-                        crypto_type=notification.crypto_type,
-                        current_price_usd=current_price,
-                        current_price_brl=current_price_brl,
-                        threshold_value=notification.threshold_value
-                    ))
-            
-            if triggered_logs:
-                db.add_all(triggered_logs)
-                logger.info(f"🚨 {len(triggered_logs)} notificação(ões) disparada(s) para {crypto_type.value}")
-        
-        if triggered_logs:
+        start = time.perf_counter()
+        notification_index.ensure_fresh(db)
+        now = datetime.utcnow()
+        fired_ids = {}
+        transitions = []
+        for crypto_type, prices in price_data.items():
+            fired, changed = notification_index.evaluate(crypto_type, prices["usd"], now)
+            transitions.extend(changed)
+            if fired:
+                fired_ids[crypto_type] = fired
+                NOTIFICATIONS_TRIGGERED.labels(crypto_type.value).inc(len(fired))
+                logger.info(f"🚨 {len(fired)} notificação(ões) disparada(s) para {crypto_type.value}")
+
+        if transitions:
+            persist_transitions(db, transitions)
+            insert_logs(db, fired_ids, price_data, now, NOTIFICATION_SHARD_INSERT_BATCH)
+            if lease is not None:
+                lease.fence(db)
             db.commit()
-            logger.info(f"✅ {len(triggered_logs)} notificação(ões) processada(s)")
+            fired_total = sum(len(ids) for ids in fired_ids.values())
+            logger.info(f"✅ {fired_total} notificação(ões) disparada(s), {len(transitions)} mudança(s) de estado")
         else:
-            logger.info("✅ Nenhuma notificação foi atingida")
-    
+            logger.info("✅ Nenhuma notificação mudou de estado")
+        # Logs gravados acima chegam aos streams pela mesma consulta incremental dos seguidores
+        notification_relay.poll(db)
+        prune_notification_changes(db)
+        observe_stage("notifications", time.perf_counter() - start)
+
+    except LeaseLost:
+        # Líder deposto: interromper o pipeline (save_prices_to_db) em vez de seguir com o tick
+        db.rollback()
+        notification_index.invalidate()
+        raise
     except Exception as e:
         logger.error(f"❌ Erro ao verificar notificações: {e}")
-        db.rollback()
\ No newline at end of file
+        db.rollback()
+        # O estado em memória pode ter divergido do banco
+        notification_index.invalidate()
+
+def check_notifications_sharded(db: Session, price_data: dict, lease=None):
+    """Avaliar o tick nos shards (NOTIFICATION_SHARDS processos em paralelo)"""
+    start = time.perf_counter()
+    results = notification_shards.evaluate(db, price_data, datetime.utcnow(), lease)
+    fired_total = 0
+    transitions_total = 0
+    for result in results:
+        if "error" in result:
+            logger.error(f"❌ Erro no shard {result['shard']} de notificações: {result['error']}")
+            continue
+        for stage, seconds in result["timings"].items():
+            NOTIFICATION_SHARD_DURATION.labels(str(result["shard"]), stage).observe(seconds)
+        for crypto, count in result["fired"].items():
+            NOTIFICATIONS_TRIGGERED.labels(crypto).inc(count)
+        fired = sum(result["fired"].values())
+        fired_total += fired
+        transitions_total += result["transitions"]
+        timings = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in result["timings"].items())
+        logger.info(f"🧩 Shard {result['shard']}: {result['notifications']} notificação(ões), {fired} disparada(s) ({timings})")
+    # Os logs foram gravados pelos shards: repassá-los aos streams como nos seguidores
+    notification_relay.poll(db)
+    prune_notification_changes(db)
+    observe_stage("notifications", time.perf_counter() - start)
+    logger.info(f"✅ {fired_total} notificação(ões) disparada(s), {transitions_total} mudança(s) de estado em {len(results)} shard(s)")
+    return results
@@ -0,0 +1,217 @@
+from sqlalchemy import create_engine, func, insert, update, select, literal, bindparam, Float, DateTime
+from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from models import Notification, NotificationLog
+from config import DATABASE_URL, NOTIFICATION_SHARDS, NOTIFICATION_SHARD_INSERT_BATCH, NOTIFICATION_INDEX_RELOAD_SECONDS
+from services.notification_index import NotificationIndex
+from services.leader_service import check_lease, LeaseLost
+import multiprocessing
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+def persist_transitions(db, transitions):
+    """Gravar as mudanças de estado com um único UPDATE em lote"""
+    notifications = Notification.__table__
+    db.execute(
+        update(notifications)
+        .where(notifications.c.id == bindparam("_id"))
+        .values(is_triggered=bindparam("_triggered"), last_triggered_at=bindparam("_last_triggered_at")),
+        [
+            {"_id": notification_id, "_triggered": triggered, "_last_triggered_at": last_triggered_at}
+            for notification_id, triggered, last_triggered_at in transitions
+        ]
+    )
+
+LOG_COLUMNS = [
+    "notification_id", "user_id", "crypto_type", "current_price_usd", "current_price_brl", "threshold_value", "triggered_at"
+]
+
+def insert_logs(connection, fired: dict, price_data: dict, now: datetime, batch_size: int):
+    """Gravar os logs das notificações disparadas com INSERT ... SELECT, em lotes.
+
+    fired é {CryptoType: [ids]}. Dono e limiar vêm da própria tabela
+    notifications, então uma notificação removida por outro processo após a
+    última sincronização é ignorada em vez de violar a chave estrangeira.
+    """
+    logs = NotificationLog.__table__
+    notifications = Notification.__table__
+    for crypto_type, notification_ids in fired.items():
+        prices = price_data[crypto_type]
+        for position in range(0, len(notification_ids), batch_size):
+            rows = select(
+                notifications.c.id, notifications.c.user_id, notifications.c.crypto_type,
+                literal(prices["usd"], Float), literal(prices["brl"], Float),
+                notifications.c.threshold_value, literal(now, DateTime)
+            ).where(notifications.c.id.in_(notification_ids[position:position + batch_size]))
+            connection.execute(insert(logs).from_select(LOG_COLUMNS, rows))
+
+# Estado do processo de um shard (definido por _init_shard)
+_engine = None
+_index = None
+
+def _init_shard(database_url: str):
+    global _engine, _index
+    _engine = create_engine(database_url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+    _index = NotificationIndex()
+
+def _load_shard(id_range):
+    start = time.perf_counter()
+    _index.set_range(id_range)
+    with Session(_engine) as db:
+        _index.load(db)
+    return len(_index), time.perf_counter() - start
+
+def _evaluate_shard(id_range, price_data: dict, now: datetime, batch_size: int, reload: bool, lease_token=None):
+    """Avaliar um tick no shard e gravar seus logs na própria conexão.
+
+    As alterações feitas por qualquer worker chegam pela tabela notification_changes
+    (ensure_fresh). Com lease_token (nome, dono, geração), a posse do lease é
+    conferida na transação dos logs. Retorna o resumo do shard com o tempo de
+    cada etapa.
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        if reload:
+            _index.invalidate()
+        _index.set_range(id_range)
+        with Session(_engine) as db:
+            _index.ensure_fresh(db)
+        timings["sync"] = time.perf_counter() - start
+
+        begin = time.perf_counter()
+        fired_ids = {}
+        transitions = []
+        for crypto_type, prices in price_data.items():
+            fired, changed = _index.evaluate(crypto_type, prices["usd"], now)
+            transitions.extend(changed)
+            if fired:
+                fired_ids[crypto_type] = fired
+        timings["evaluate"] = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        if transitions:
+            with _engine.begin() as connection:
+                if lease_token is not None:
+                    check_lease(connection, *lease_token)
+                persist_transitions(connection, transitions)
+                insert_logs(connection, fired_ids, price_data, now, batch_size)
+        timings["persist"] = time.perf_counter() - begin
+    except Exception:
+        # O estado em memória pode ter divergido do banco (ou perdido alterações)
+        _index.invalidate()
+        raise
+    timings["total"] = time.perf_counter() - start
+    return {
+        "notifications": len(_index),
+        "fired": {crypto_type.value: len(ids) for crypto_type, ids in fired_ids.items()},
+        "transitions": len(transitions),
+        "timings": timings
+    }
+
+class NotificationShards:
+    """Avaliação de notificações em paralelo, particionada por faixa de id.
+
+    Cada shard é um processo próprio (pool de um único worker, para que o
+    índice em memória permaneça no mesmo processo) que mantém o
+    NotificationIndex da sua faixa, avalia o tick e grava logs e mudanças de
+    estado em uma transação na sua própria conexão. As faixas dividem
+    [menor id, maior id] das notificações ativas em partes iguais e são
+    recalculadas a cada NOTIFICATION_INDEX_RELOAD_SECONDS; o último shard
+    não tem limite superior e recebe as notificações novas. Cada shard lê
+    as alterações da sua faixa em notification_changes a cada tick, qualquer
+    que seja o worker que as fez.
+    """
+
+    def __init__(self, shards: int, batch_size: int):
+        self.shards = shards
+        self.batch_size = batch_size
+        self._executors = []
+        self._ranges = None
+        self._ranges_at = None
+        self._reload = False
+
+    @property
+    def enabled(self):
+        return self.shards > 0
+
+    def start(self):
+        if self._executors:
+            return
+        self._executors = [self._executor() for _ in range(self.shards)]
+
+    def _executor(self):
+        # spawn: o processo pai tem threads (event loop, threadpool) e conexões abertas
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_shard, initargs=(DATABASE_URL,))
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = []
+
+    def invalidate(self):
+        """Forçar recarga completa (e novas faixas) de todos os shards no próximo tick"""
+        self._ranges = None
+        self._reload = True
+
+    def id_ranges(self, db: Session):
+        """Faixas [início, fim) de cada shard, recalculadas periodicamente"""
+        if self._ranges is not None and time.monotonic() - self._ranges_at < NOTIFICATION_INDEX_RELOAD_SECONDS:
+            return self._ranges
+        low, high = db.query(func.min(Notification.id), func.max(Notification.id)).filter(Notification.is_active == True).one()
+        low, high = low or 1, high or 1
+        width = max(1, (high - low + 1 + self.shards - 1) // self.shards)
+        bounds = [low + width * number for number in range(self.shards)]
+        self._ranges = [
+            (None if number == 0 else bounds[number], None if number == self.shards - 1 else bounds[number + 1])
+            for number in range(self.shards)
+        ]
+        self._ranges_at = time.monotonic()
+        return self._ranges
+
+    def load(self, db: Session):
+        """Carregar o índice de todos os shards em paralelo"""
+        self.start()
+        ranges = self.id_ranges(db)
+        self._reload = False
+        futures = [executor.submit(_load_shard, ranges[number]) for number, executor in enumerate(self._executors)]
+        total = 0
+        for number, future in enumerate(futures):
+            count, seconds = future.result()
+            total += count
+            logger.info(f"📇 Shard {number}: {count} notificação(ões) ativa(s) carregada(s) em {seconds:.2f}s")
+        return total
+
+    def evaluate(self, db: Session, price_data: dict, now: datetime, lease=None):
+        """Avaliar um tick em todos os shards; retorna o resumo de cada shard (ou o erro)"""
+        self.start()
+        ranges = self.id_ranges(db)
+        reload, self._reload = self._reload, False
+        lease_token = lease.token() if lease is not None else None
+        futures = [
+            executor.submit(_evaluate_shard, ranges[number], price_data, now, self.batch_size, reload, lease_token)
+            for number, executor in enumerate(self._executors)
+        ]
+        results = []
+        for number, future in enumerate(futures):
+            try:
+                result = future.result()
+            except LeaseLost:
+                # Os shards conferem o lease na própria transação: o líder foi deposto
+                raise
+            except BrokenProcessPool as e:
+                # Processo do shard morreu: recriá-lo (recarrega a faixa no próximo tick)
+                self._executors[number] = self._executor()
+                result = {"error": str(e)}
+            except Exception as e:
+                result = {"error": str(e)}
+            result["shard"] = number
+            results.append(result)
+        return results
+
+notification_shards = NotificationShards(NOTIFICATION_SHARDS, NOTIFICATION_SHARD_INSERT_BATCH)
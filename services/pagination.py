@@ -0,0 +1,53 @@
+from fastapi import HTTPException, Response
+from datetime import datetime
+from dependencies import SessionLocal
+import base64
+import itertools
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 1000
+
+def encode_cursor(timestamp: datetime, row_id: int):
+    """Codificar a posição (timestamp, id) de um registro como cursor opaco"""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    """Decodificar um cursor gerado por encode_cursor"""
+    if cursor is None:
+        return None
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def paginate(response: Response, rows, limit: int, key):
+    """Cortar a página e publicar o cursor da próxima no header X-Next-Cursor.
+
+    rows deve ter sido consultado com limit + 1 para detectar a próxima página.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
+
+def iter_ndjson(rows, serializer):
+    """NDJSON em lotes de STREAM_BATCH_SIZE linhas (uma validação por lote)"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            return
+        yield serializer.dump_lines(batch)
+
+def stream_ndjson(query_fn, serializer, session_factory=SessionLocal):
+    """Gerar NDJSON a partir de um cursor no servidor com memória constante.
+
+    Usa uma sessão própria (de session_factory), pois a sessão da requisição
+    é fechada antes do envio do corpo.
+    """
+    db = session_factory()
+    try:
+        yield from iter_ndjson(query_fn(db).yield_per(STREAM_BATCH_SIZE), serializer)
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,95 @@
+from fastapi import HTTPException
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_RETRY_AFTER_SECONDS
+import asyncio
+import multiprocessing
+import time
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _hash(password: str):
+    start = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, time.perf_counter() - start
+
+def _verify(password: str, hashed_password: str):
+    start = time.perf_counter()
+    valid = pwd_context.verify(password, hashed_password)
+    return valid, time.perf_counter() - start
+
+def _warm():
+    # Carrega o backend do bcrypt no processo filho antes da primeira requisição
+    return pwd_context.verify("", pwd_context.hash(""))
+
+class PasswordHasher:
+    """Executa bcrypt em um pool de processos dedicado com fila limitada.
+
+    O hash não ocupa o GIL nem o threadpool das rotas; quando a fila está
+    cheia a requisição recebe 503 com Retry-After. O pool é criado por
+    start() na inicialização da aplicação.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serviço de autenticação sobrecarregado, tente novamente",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+            )
+        if self._executor is None:
+            self.start()
+        self.pending += 1
+        try:
+            result, elapsed = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.hash_seconds_total += elapsed
+        self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+        return result
+
+    async def hash(self, password: str):
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str):
+        return await self._submit(_verify, password, hashed_password)
+
+    def start(self):
+        """Criar o pool e iniciar seus processos em background"""
+        if self._executor is not None:
+            return
+        # spawn: o processo pai tem threads (event loop, threadpool) e conexões abertas
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        for _ in range(self.workers):
+            self._executor.submit(_warm)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_avg": self.hash_seconds_total / self.completed if self.completed else None,
+            "hash_seconds_max": self.hash_seconds_max
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,53 @@
+from models import CryptoType
+from services.price_cache import price_cache
+
+async def value_portfolio(db, rows):
+    """Valorizar todos os endereços do usuário em uma única passada.
+
+    Retorna None se faltar preço para algum ativo da carteira.
+    """
+    prices = {}
+    for crypto in {CryptoType(address_type.value) for _, _, address_type, _ in rows}:
+        price = await price_cache.aget(db, crypto)
+        if price is None:
+            return None
+        prices[crypto] = price
+
+    addresses = []
+    assets = {}
+    total_usd = 0.0
+    total_brl = 0.0
+    for address_id, address, address_type, balance in rows:
+        crypto = CryptoType(address_type.value)
+        price = prices[crypto]
+        balance = balance or 0.0
+        balance_usd = balance * price.price_usd
+        balance_brl = balance * price.price_brl
+        addresses.append({
+            "id": address_id,
+            "address": address,
+            "crypto_type": crypto.value,
+            "balance_crypto": balance,
+            "balance_usd": balance_usd,
+            "balance_brl": balance_brl
+        })
+        asset = assets.setdefault(crypto, {
+            "crypto_type": crypto.value,
+            "address_count": 0,
+            "balance_crypto": 0.0,
+            "balance_usd": 0.0,
+            "balance_brl": 0.0
+        })
+        asset["address_count"] += 1
+        asset["balance_crypto"] += balance
+        asset["balance_usd"] += balance_usd
+        asset["balance_brl"] += balance_brl
+        total_usd += balance_usd
+        total_brl += balance_brl
+
+    return {
+        "addresses": addresses,
+        "assets": list(assets.values()),
+        "total_usd": total_usd,
+        "total_brl": total_brl
+    }
\ No newline at end of file
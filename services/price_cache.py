@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from datetime import datetime
+from models import CryptoType
+from crud import get_latest_price
+from services.single_flight import latest_price_flight, latest_price_sync_flight
+import crud_async
+import threading
+
+@dataclass(frozen=True)
+class CachedPrice:
+    crypto: CryptoType
+    price_usd: float
+    price_brl: float
+    last_updated: datetime
+
+class PriceCache:
+    """Cache de processo com o último preço de cada criptomoeda.
+
+    Alimentado por save_prices_to_db a cada atualização; em partida a frio
+    o valor é lido do banco uma única vez, mesmo com requisições
+    concorrentes (single-flight por criptomoeda).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prices = {}
+
+    def update(self, crypto: CryptoType, price_usd: float, price_brl: float, last_updated: datetime):
+        with self._lock:
+            self._prices[crypto] = CachedPrice(crypto, price_usd, price_brl, last_updated)
+
+    def get(self, db: Session, crypto):
+        """Obter o último preço, consultando o banco apenas se o cache estiver vazio"""
+        crypto = CryptoType(crypto.value)  # Aceita também AddressType
+        cached = self._prices.get(crypto)
+        if cached is not None:
+            return cached
+        return latest_price_sync_flight.do(crypto, lambda: self._store(get_latest_price(db, crypto)))
+
+    async def aget(self, db, crypto):
+        """Versão assíncrona de get (Session ou AsyncSession)"""
+        crypto = CryptoType(crypto.value)
+        cached = self._prices.get(crypto)
+        if cached is not None:
+            return cached
+
+        async def load():
+            return self._store(await crud_async.get_latest_price(db, crypto))
+
+        return await latest_price_flight.do(crypto, load)
+
+    def _store(self, price):
+        """Guardar o Price lido do banco; o CachedPrice retornado é compartilhado entre as requisições"""
+        if price is None:
+            return None
+        self.update(price.crypto, price.price_usd, price.price_brl, price.last_updated)
+        return self._prices[price.crypto]
+
+    def peek(self, crypto: CryptoType):
+        """Preço em cache sem recorrer ao banco (None se ausente)"""
+        return self._prices.get(crypto)
+
+    def age_seconds(self, crypto: CryptoType):
+        """Idade em segundos do preço em cache (None se ausente)"""
+        cached = self._prices.get(crypto)
+        if cached is None or cached.last_updated is None:
+            return None
+        return (datetime.utcnow() - cached.last_updated).total_seconds()
+
+price_cache = PriceCache()
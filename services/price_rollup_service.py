@@ -0,0 +1,150 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from models import Price, PriceCandle, CryptoType, CandleInterval
+from config import PRICE_RETENTION_DAYS, PRICE_RETENTION_INTERVAL_SECONDS, PRICE_LEADER_HEARTBEAT_SECONDS
+from dependencies import SessionLocal
+from services.leader_service import price_leader, LeaseLost
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+def bucket_start(timestamp: datetime, interval: CandleInterval):
+    """Início do período (hora ou dia) que contém o timestamp"""
+    if interval == CandleInterval.HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class CandleAggregate:
+    """Agregado OHLC em memória de um período"""
+    __slots__ = ("first_at", "last_at", "open_usd", "high_usd", "low_usd", "close_usd",
+                 "open_brl", "high_brl", "low_brl", "close_brl")
+
+    def __init__(self, timestamp, price_usd, price_brl):
+        self.first_at = self.last_at = timestamp
+        self.open_usd = self.high_usd = self.low_usd = self.close_usd = price_usd
+        self.open_brl = self.high_brl = self.low_brl = self.close_brl = price_brl
+
+    def add(self, timestamp, price_usd, price_brl):
+        self.high_usd = max(self.high_usd, price_usd)
+        self.low_usd = min(self.low_usd, price_usd)
+        self.high_brl = max(self.high_brl, price_brl)
+        self.low_brl = min(self.low_brl, price_brl)
+        if timestamp < self.first_at:
+            self.first_at, self.open_usd, self.open_brl = timestamp, price_usd, price_brl
+        if timestamp >= self.last_at:
+            self.last_at, self.close_usd, self.close_brl = timestamp, price_usd, price_brl
+
+def _merge(candle: PriceCandle, aggregate: CandleAggregate):
+    """Combinar um agregado com um candle existente (operação idempotente)"""
+    candle.high_usd = max(candle.high_usd, aggregate.high_usd)
+    candle.low_usd = min(candle.low_usd, aggregate.low_usd)
+    candle.high_brl = max(candle.high_brl, aggregate.high_brl)
+    candle.low_brl = min(candle.low_brl, aggregate.low_brl)
+    if aggregate.first_at < candle.first_at:
+        candle.first_at, candle.open_usd, candle.open_brl = aggregate.first_at, aggregate.open_usd, aggregate.open_brl
+    if aggregate.last_at >= candle.last_at:
+        candle.last_at, candle.close_usd, candle.close_brl = aggregate.last_at, aggregate.close_usd, aggregate.close_brl
+
+def _new_candle(crypto: CryptoType, interval: CandleInterval, start: datetime, aggregate: CandleAggregate):
+    return PriceCandle(
+        crypto=crypto, interval=interval, bucket_start=start,
+        first_at=aggregate.first_at, last_at=aggregate.last_at,
+        open_usd=aggregate.open_usd, high_usd=aggregate.high_usd, low_usd=aggregate.low_usd, close_usd=aggregate.close_usd,
+        open_brl=aggregate.open_brl, high_brl=aggregate.high_brl, low_brl=aggregate.low_brl, close_brl=aggregate.close_brl
+    )
+
+def update_candles(db: Session, crypto: CryptoType, price_usd: float, price_brl: float, timestamp: datetime):
+    """Atualizar incrementalmente os candles 1h e 1d com um novo tick (sem commit)"""
+    aggregate = CandleAggregate(timestamp, price_usd, price_brl)
+    for interval in CandleInterval:
+        start = bucket_start(timestamp, interval)
+        candle = db.query(PriceCandle).filter(
+            PriceCandle.crypto == crypto,
+            PriceCandle.interval == interval,
+            PriceCandle.bucket_start == start
+        ).first()
+        if candle is None:
+            db.add(_new_candle(crypto, interval, start, aggregate))
+        else:
+            _merge(candle, aggregate)
+
+def compact_prices(db: Session, retention_days: int = PRICE_RETENTION_DAYS, batch_size: int = 10000, lease=None):
+    """Compactar preços brutos mais antigos que retention_days em candles e removê-los.
+
+    Com lease, a posse é conferida antes de cada commit e a compactação é
+    interrompida (LeaseLost) se outro worker assumiu a liderança.
+    """
+    cutoff = bucket_start(datetime.utcnow() - timedelta(days=retention_days), CandleInterval.DAY)
+    removed = 0
+    for crypto in CryptoType:
+        aggregates = {interval: {} for interval in CandleInterval}
+        rows = db.query(Price.last_updated, Price.price_usd, Price.price_brl).filter(
+            Price.crypto == crypto,
+            Price.last_updated < cutoff
+        ).order_by(Price.last_updated).yield_per(batch_size)
+        for timestamp, price_usd, price_brl in rows:
+            for interval, buckets in aggregates.items():
+                start = bucket_start(timestamp, interval)
+                aggregate = buckets.get(start)
+                if aggregate is None:
+                    buckets[start] = CandleAggregate(timestamp, price_usd, price_brl)
+                else:
+                    aggregate.add(timestamp, price_usd, price_brl)
+
+        for interval, buckets in aggregates.items():
+            if not buckets:
+                continue
+            existing = {
+                candle.bucket_start: candle for candle in db.query(PriceCandle).filter(
+                    PriceCandle.crypto == crypto,
+                    PriceCandle.interval == interval,
+                    PriceCandle.bucket_start >= min(buckets),
+                    PriceCandle.bucket_start <= max(buckets)
+                )
+            }
+            for start, aggregate in buckets.items():
+                candle = existing.get(start)
+                if candle is None:
+                    db.add(_new_candle(crypto, interval, start, aggregate))
+                else:
+                    _merge(candle, aggregate)
+
+        removed += db.query(Price).filter(
+            Price.crypto == crypto,
+            Price.last_updated < cutoff
+        ).delete(synchronize_session=False)
+        if lease is not None:
+            try:
+                lease.fence(db)
+            except LeaseLost:
+                db.rollback()
+                raise
+        db.commit()
+    logger.info(f"🗜️ {removed} preço(s) anteriores a {cutoff.date()} compactado(s) em candles")
+    return removed
+
+async def run_price_retention():
+    """Tarefa em background que compacta periodicamente os preços antigos (apenas no worker líder)"""
+    while True:
+        if not price_leader.is_leader:
+            await asyncio.sleep(PRICE_LEADER_HEARTBEAT_SECONDS)
+            continue
+        db = SessionLocal()
+        try:
+            await asyncio.to_thread(compact_prices, db, PRICE_RETENTION_DAYS, lease=price_leader)
+        except LeaseLost as e:
+            logger.warning(f"⚠️ Compactação interrompida, liderança perdida: {e}")
+        except Exception as e:
+            logger.error(f"❌ Erro ao compactar preços: {e}")
+            db.rollback()
+        finally:
+            db.close()
+        await asyncio.sleep(PRICE_RETENTION_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        compact_prices(session)
+    finally:
+        session.close()
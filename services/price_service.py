@@ -3,54 +3,202 @@ import asyncio
 from tenacity import retry, stop_after_attempt, wait_exponential
 from sqlalchemy.orm import Session
 from models import Price, CryptoType
-from config import COINGECKO_API_URL
-from services.notification_service import check_notifications
+from config import COINGECKO_API_URL, PRICE_ASSETS, PRICE_HTTP_TIMEOUT_SECONDS, PRICE_LEADER_HEARTBEAT_SECONDS, STREAM_RELAY_INTERVAL_SECONDS
+from services.notification_service import check_notifications, load_notification_state
+from services.price_cache import price_cache
+from services.price_rollup_service import update_candles
+from services.metrics import observe_stage
+from services.leader_service import price_leader, LeaseLost
+from services.price_sources import create_price_source, run_price_pipeline
+from services.stream_service import publish_prices, notification_relay, price_relay
+from datetime import datetime
 import structlog
+import time
 
 logger = structlog.get_logger()
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+def parse_asset_registry(spec: str):
+    """Converter "BTC=bitcoin,ETH=ethereum" em {CryptoType: id na CoinGecko}"""
+    registry = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        symbol, _, upstream_id = item.partition("=")
+        try:
+            registry[CryptoType(symbol.strip().upper())] = upstream_id.strip()
+        except ValueError:
+            logger.warning(f"⚠️ Ativo desconhecido ignorado no registro de preços: {symbol}")
+    return registry
+
+class PriceClient:
+    """Cliente HTTP da CoinGecko com sessão persistente (keep-alive).
+
+    Todos os ativos do registro são consultados em uma única requisição.
+    """
+
+    def __init__(self, base_url: str, assets: dict):
+        self.base_url = base_url
+        self.assets = assets
+        self._session = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300, keepalive_timeout=600),
+                timeout=aiohttp.ClientTimeout(total=PRICE_HTTP_TIMEOUT_SECONDS)
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def fetch(self):
+        """Obter os preços em USD e BRL de todos os ativos do registro"""
+        await self.start()
+        params = {"ids": ",".join(self.assets.values()), "vs_currencies": "usd,brl"}
+        async with self._session.get(self.base_url, params=params) as response:
+            response.raise_for_status()
+            payload = await response.json()
+        return {
+            crypto: {"usd": payload[upstream_id]["usd"], "brl": payload[upstream_id]["brl"]}
+            for crypto, upstream_id in self.assets.items()
+            if upstream_id in payload
+        }
+
+price_client = PriceClient(COINGECKO_API_URL, parse_asset_registry(PRICE_ASSETS))
+
 async def fetch_prices():
     """Fazer requisição assíncrona para a API da CoinGecko"""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(COINGECKO_API_URL, timeout=10) as response:
-            return await response.json()
+    return await price_client.fetch()
+
+def save_prices_to_db(data, db: Session, lease=None):
+    """Salvar preços no banco de dados (retorna o horário gravado ou None em caso de erro).
 
-def save_prices_to_db(data, db: Session):
-    """Salvar preços no banco de dados"""
+    Com lease, a posse é conferida na mesma transação e o tick é descartado
+    (LeaseLost) se outro worker assumiu a liderança.
+    """
     logger.info("💾 Salvando preços no banco de dados...")
     try:
-        db.add(Price(
-            crypto=CryptoType.BTC, 
-            price_usd=data["bitcoin"]["usd"],
-            price_brl=data["bitcoin"]["brl"]
-        ))
-        db.add(Price(
-            crypto=CryptoType.ETH, 
-            price_usd=data["ethereum"]["usd"],
-            price_brl=data["ethereum"]["brl"]
-        ))
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        for crypto, prices in data.items():
+            db.add(Price(
+                crypto=crypto,
+                price_usd=prices["usd"],
+                price_brl=prices["brl"],
+                last_updated=now
+            ))
+            update_candles(db, crypto, prices["usd"], prices["brl"], now)
+        if lease is not None:
+            # Fenced: o tick vai aos seguidores na mesma transação dos preços
+            lease.publish(db, {crypto.value: prices for crypto, prices in data.items()}, now)
         db.commit()
+        observe_stage("save", time.perf_counter() - start)
+        for crypto, prices in data.items():
+            price_cache.update(crypto, prices["usd"], prices["brl"], now)
         logger.info("✅ Preços salvos no banco de dados com sucesso")
-        check_notifications(db, data)
+        check_notifications(db, data, lease)
+        return now
+    except LeaseLost as e:
+        logger.warning(f"⚠️ Tick descartado, liderança perdida: {e}")
+        db.rollback()
+        lease.is_leader = False
+        raise
     except Exception as e:
         logger.error(f"❌ Erro ao salvar preços no banco: {e}")
         db.rollback()
+        return None
+
+def apply_prices(data: dict, published_at: datetime):
+    """Atualizar o cache de preços e os streams com um tick gravado pelo worker líder"""
+    for crypto, prices in data.items():
+        price_cache.update(crypto, prices["usd"], prices["brl"], published_at)
+    publish_prices(data, published_at)
+
+def run_price_tick(db: Session, data: dict, lease=None):
+    """Gravar um tick no banco e publicá-lo aos streams (com lease, também aos demais workers)"""
+    saved_at = save_prices_to_db(data, db, lease)
+    if saved_at is not None:
+        publish_prices(data, saved_at)
+    return saved_at
 
 async def update_prices():
-    """Tarefa em background para atualizar preços"""
+    """Tarefa em background para atualizar preços.
+
+    Roda em todos os workers, mas só o líder (lease em service_leases)
+    consome a fonte de preços, grava os ticks e avalia as notificações; os
+    demais recebem os ticks e alertas por run_stream_relay.
+    """
     logger.info("🔄 Iniciando tarefa de atualização de preços em background...")
-    await asyncio.sleep(10)  # Aguardar inicialização
     from main import SessionLocal  # Importação tardia para evitar dependência circular
-    while True:
+
+    def handle_tick(data):
+        db = SessionLocal()
         try:
-            data = await fetch_prices()
-            logger.info(f"💰 Preços obtidos: BTC=${data['bitcoin']['usd']}/R${data['bitcoin']['brl']}, ETH=${data['ethereum']['usd']}/R${data['ethereum']['brl']}")
+            run_price_tick(db, data, price_leader)
+        finally:
+            db.close()
+
+    pipeline = None
+    try:
+        while True:
             db = SessionLocal()
             try:
-                await asyncio.to_thread(save_prices_to_db, data, db)
+                try:
+                    is_leader = await asyncio.to_thread(price_leader.try_acquire, db)
+                except Exception as e:
+                    # Sem heartbeat o lease pode expirar e ser assumido: parar de gravar já
+                    logger.error(f"❌ Erro no heartbeat do lease: {e}")
+                    db.rollback()
+                    is_leader = price_leader.is_leader = False
+                if not is_leader and pipeline is not None:
+                    pipeline.cancel()
+                    pipeline = None
+                published_at = await asyncio.to_thread(price_leader.published_at, db)
+                failed = pipeline is not None and pipeline.done() and pipeline.exception() is not None
+                if failed:
+                    logger.error(f"❌ Pipeline de preços interrompido: {pipeline.exception()}")
+                if is_leader and pipeline is None:
+                    # Só o líder mantém o índice de notificações: carregá-lo ao assumir
+                    await asyncio.to_thread(load_notification_state, db)
+                if is_leader and (pipeline is None or failed):
+                    source = create_price_source(price_client, price_client.assets, published_at)
+                    logger.info(f"📡 Fonte de preços: {source.name}")
+                    pipeline = asyncio.create_task(run_price_pipeline(source, handle_tick))
+            except Exception as e:
+                logger.error(f"❌ Erro ao atualizar preços: {e}")
             finally:
                 db.close()
-        except Exception as e:
-            logger.error(f"❌ Erro ao atualizar preços: {e}")
-        await asyncio.sleep(300)  # Aguardar 5 minutos
\ No newline at end of file
+            await asyncio.sleep(PRICE_LEADER_HEARTBEAT_SECONDS)
+    finally:
+        # Encerramento: não deixar o pipeline (e a fonte de preços) órfão
+        if pipeline is not None:
+            pipeline.cancel()
+            await asyncio.gather(pipeline, return_exceptions=True)
+
+async def run_stream_relay():
+    """Repassar aos workers seguidores os ticks e alertas gravados pelo líder.
+
+    Roda a cada STREAM_RELAY_INTERVAL_SECONDS, independente do heartbeat do
+    lease; no líder não consulta nada (ele publica ao gravar).
+    """
+    from main import SessionLocal  # Importação tardia para evitar dependência circular
+
+    def relay():
+        db = SessionLocal()
+        try:
+            for published_at, data in price_relay.poll(db):
+                apply_prices(data, published_at)
+            notification_relay.poll(db)
+        finally:
+            db.close()
+
+    while True:
+        if price_leader.is_leader:
+            price_relay.reset()
+        else:
+            try:
+                await asyncio.to_thread(relay)
+            except Exception as e:
+                logger.error(f"❌ Erro ao repassar ticks do líder: {e}")
+        await asyncio.sleep(STREAM_RELAY_INTERVAL_SECONDS)
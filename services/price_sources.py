@@ -0,0 +1,251 @@
+from datetime import datetime
+from models import CryptoType
+from config import (
+    PRICE_SOURCE, PRICE_STREAM_URL, PRICE_REPLAY_FILE, PRICE_REPLAY_SPEED, PRICE_REPLAY_LOOP,
+    PRICE_UPDATE_INTERVAL_SECONDS, PRICE_TICK_WINDOW_SECONDS
+)
+from services.metrics import PRICE_TICKS_RECEIVED, observe_stage
+import abc
+import aiohttp
+import asyncio
+import json
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+class PriceSource(abc.ABC):
+    """Fonte de ticks de preço.
+
+    ticks() é um iterador assíncrono de dicts {CryptoType: {"usd", "brl"}};
+    um tick pode trazer apenas parte dos ativos.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def ticks(self):
+        """Iterador assíncrono de ticks (implementado como async generator)"""
+
+    async def close(self):
+        pass
+
+def parse_tick(payload: dict, aliases: dict):
+    """Converter {"BTC" ou id da CoinGecko: {"usd", "brl"}} em {CryptoType: {"usd", "brl"}}"""
+    tick = {}
+    for key, prices in payload.items():
+        crypto = aliases.get(key) or aliases.get(str(key).upper())
+        if crypto is not None and isinstance(prices, dict) and "usd" in prices and "brl" in prices:
+            tick[crypto] = {"usd": float(prices["usd"]), "brl": float(prices["brl"])}
+    return tick
+
+def _aliases(assets: dict):
+    """Símbolos e ids da CoinGecko aceitos para cada ativo do registro"""
+    aliases = {crypto.value: crypto for crypto in assets}
+    aliases.update({upstream_id: crypto for crypto, upstream_id in assets.items()})
+    return aliases
+
+class PollingPriceSource(PriceSource):
+    """Consulta a CoinGecko a cada interval segundos (comportamento original)"""
+    name = "polling"
+
+    def __init__(self, client, interval: float, last_tick_at: datetime = None):
+        self.client = client
+        self.interval = interval
+        self.last_tick_at = last_tick_at
+
+    async def ticks(self):
+        if self.last_tick_at is not None:
+            # Após um failover, respeitar o intervalo desde o último tick publicado
+            elapsed = (datetime.utcnow() - self.last_tick_at).total_seconds()
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+        while True:
+            try:
+                start = time.perf_counter()
+                data = await self.client.fetch()
+                observe_stage("fetch", time.perf_counter() - start)
+                summary = ", ".join(f"{crypto.value}=${prices['usd']}/R${prices['brl']}" for crypto, prices in data.items())
+                logger.info(f"💰 Preços obtidos: {summary}")
+                yield data
+            except Exception as e:
+                logger.error(f"❌ Erro ao buscar preços: {e}")
+            await asyncio.sleep(self.interval)
+
+class WebSocketPriceSource(PriceSource):
+    """Feed contínuo via WebSocket.
+
+    Cada mensagem de texto é um objeto JSON {"BTC": {"usd": ..., "brl": ...}}
+    (símbolo ou id da CoinGecko). Reconecta com backoff exponencial.
+    """
+    name = "websocket"
+
+    def __init__(self, url: str, assets: dict, max_backoff: float = 30.0):
+        self.url = url
+        self.aliases = _aliases(assets)
+        self.max_backoff = max_backoff
+        self._session = None
+
+    async def ticks(self):
+        backoff = 1.0
+        self._session = aiohttp.ClientSession()
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, heartbeat=30) as ws:
+                    logger.info(f"🔌 Conectado ao feed de preços {self.url}")
+                    backoff = 1.0
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            try:
+                                tick = parse_tick(json.loads(message.data), self.aliases)
+                            except (ValueError, AttributeError):
+                                logger.warning("⚠️ Mensagem inválida ignorada no feed de preços")
+                                continue
+                            if tick:
+                                yield tick
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except aiohttp.ClientError as e:
+                logger.error(f"❌ Erro no feed de preços: {e}")
+            logger.warning(f"⚠️ Feed de preços desconectado, reconectando em {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+class ReplayPriceSource(PriceSource):
+    """Reproduz ticks gravados em NDJSON ({"at": ISO, "prices": {...}}) a N× a velocidade real.
+
+    speed=0 reproduz sem pausas (gerador de carga local).
+    """
+    name = "replay"
+
+    def __init__(self, path: str, assets: dict, speed: float = 1.0, loop: bool = False):
+        self.path = path
+        self.aliases = _aliases(assets)
+        self.speed = speed
+        self.loop = loop
+
+    async def ticks(self):
+        while True:
+            previous = None
+            with open(self.path) as replay:
+                for line in replay:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    at = datetime.fromisoformat(record["at"])
+                    if previous is not None and self.speed > 0:
+                        await asyncio.sleep(max(0.0, (at - previous).total_seconds() / self.speed))
+                    previous = at
+                    tick = parse_tick(record["prices"], self.aliases)
+                    if tick:
+                        yield tick
+                    if self.speed <= 0:
+                        await asyncio.sleep(0)  # Não monopolizar o event loop
+            if not self.loop:
+                logger.info(f"⏹️ Reprodução de {self.path} concluída")
+                return
+
+def create_price_source(client, assets: dict, last_tick_at: datetime = None):
+    """Fonte configurada em PRICE_SOURCE (polling, websocket ou replay)"""
+    if PRICE_SOURCE == "websocket":
+        return WebSocketPriceSource(PRICE_STREAM_URL, assets)
+    if PRICE_SOURCE == "replay":
+        return ReplayPriceSource(PRICE_REPLAY_FILE, assets, PRICE_REPLAY_SPEED, PRICE_REPLAY_LOOP)
+    if PRICE_SOURCE != "polling":
+        logger.warning(f"⚠️ PRICE_SOURCE desconhecido ({PRICE_SOURCE}), usando polling")
+    return PollingPriceSource(client, PRICE_UPDATE_INTERVAL_SECONDS, last_tick_at)
+
+async def run_price_pipeline(source: PriceSource, handle_tick, window: float = PRICE_TICK_WINDOW_SECONDS):
+    """Consumir a fonte e processar os ticks agregados no máximo uma vez por janela.
+
+    Rajadas de ticks dentro da janela são combinadas (último preço de cada
+    ativo) e handle_tick(data) é chamado em uma thread com o resultado.
+    """
+    pending = {}
+    arrived = asyncio.Event()
+
+    async def consume():
+        async for tick in source.ticks():
+            PRICE_TICKS_RECEIVED.labels(source.name).inc()
+            pending.update(tick)
+            arrived.set()
+
+    consumer = asyncio.create_task(consume())
+    try:
+        while True:
+            waiter = asyncio.create_task(arrived.wait())
+            await asyncio.wait({waiter, consumer}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if pending:
+                data = dict(pending)
+                pending.clear()
+                arrived.clear()
+                started = time.monotonic()
+                await asyncio.to_thread(handle_tick, data)
+                # Ticks que chegarem até o fim da janela entram no próximo lote
+                await asyncio.sleep(max(0.0, window - (time.monotonic() - started)))
+            elif consumer.done():
+                consumer.result()  # Propaga erro da fonte, se houver
+                return
+    finally:
+        consumer.cancel()
+        await source.close()
+
+def export_ticks(db, path: str, since: datetime = None):
+    """Gravar os preços brutos do banco como arquivo de replay NDJSON"""
+    from models import Price
+    query = db.query(Price.last_updated, Price.crypto, Price.price_usd, Price.price_brl)
+    if since is not None:
+        query = query.filter(Price.last_updated >= since)
+    count = 0
+    current_at, prices = None, {}
+    with open(path, "w") as replay:
+        for last_updated, crypto, price_usd, price_brl in query.order_by(Price.last_updated, Price.id).yield_per(10000):
+            if last_updated != current_at and prices:
+                replay.write(json.dumps({"at": current_at.isoformat(), "prices": prices}) + "\n")
+                count += 1
+                prices = {}
+            current_at = last_updated
+            prices[crypto.value] = {"usd": price_usd, "brl": price_brl}
+        if prices:
+            replay.write(json.dumps({"at": current_at.isoformat(), "prices": prices}) + "\n")
+            count += 1
+    logger.info(f"📼 {count} tick(s) exportado(s) para {path}")
+    return count
+
+if __name__ == "__main__":
+    import argparse
+    from dependencies import SessionLocal
+    from config import PRICE_ASSETS
+    from services.price_service import parse_asset_registry, run_price_tick
+
+    parser = argparse.ArgumentParser(description="Gravar e reproduzir ticks de preço")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Exportar os preços do banco para um arquivo de replay")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--since", type=datetime.fromisoformat)
+    replay_parser = commands.add_parser("replay", help="Reproduzir um arquivo no pipeline de preços (gerador de carga)")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--speed", type=float, default=PRICE_REPLAY_SPEED)
+    replay_parser.add_argument("--window", type=float, default=PRICE_TICK_WINDOW_SECONDS)
+    replay_parser.add_argument("--loop", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        session = SessionLocal()
+        try:
+            export_ticks(session, args.path, args.since)
+        finally:
+            session.close()
+    else:
+        def handle_tick(data):
+            session = SessionLocal()
+            try:
+                run_price_tick(session, data)
+            finally:
+                session.close()
+        source = ReplayPriceSource(args.path, parse_asset_registry(PRICE_ASSETS), args.speed, args.loop)
+        asyncio.run(run_price_pipeline(source, handle_tick, args.window))
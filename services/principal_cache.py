@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from config import PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_SYNC_SECONDS
+import threading
+import time
+
+# Alterações relidas a cada sincronização: ids autoincrementais podem ser
+# confirmados fora de ordem por transações concorrentes
+CHANGE_LOOKBACK = 100
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Representação leve do usuário autenticado usada pelas rotas"""
+    id: int
+    name: str
+    email: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, name=user.name, email=user.email, is_active=user.is_active)
+
+class PrincipalCache:
+    """Cache LRU com TTL do subject do token para o UserPrincipal.
+
+    Evita o SELECT em users a cada requisição autenticada. Alterações feitas
+    neste processo invalidam a entrada explicitamente; as dos demais
+    processos chegam pela tabela principal_changes, lida no máximo uma vez
+    a cada sync_seconds (sync_after / apply_changes).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, sync_seconds: float = PRINCIPAL_CACHE_SYNC_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._change_id = 0
+        self._applied_changes = set()
+        self._synced_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(subject)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+
+    def put(self, subject: str, principal: UserPrincipal):
+        with self._lock:
+            self._entries[subject] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def sync_after(self):
+        """Id a partir do qual ler principal_changes, ou None se ainda não é hora.
+
+        Reserva a sincronização: requisições concorrentes não a repetem.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+                return None
+            self._synced_at = now
+            return self._change_id - CHANGE_LOOKBACK
+
+    def apply_changes(self, changes):
+        """Descartar as entradas dos e-mails em changes [(id, email)] ainda não aplicados"""
+        with self._lock:
+            changes = [(change_id, email) for change_id, email in changes if change_id not in self._applied_changes]
+            if not changes:
+                return 0
+            for _, email in changes:
+                self._entries.pop(email, None)
+            self._change_id = max(self._change_id, max(change_id for change_id, _ in changes))
+            self._applied_changes.update(change_id for change_id, _ in changes)
+            self._applied_changes = {
+                change_id for change_id in self._applied_changes if change_id > self._change_id - CHANGE_LOOKBACK
+            }
+            return len(changes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None
+            }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
\ No newline at end of file
@@ -0,0 +1,103 @@
+from contextvars import ContextVar
+from starlette.datastructures import MutableHeaders
+from config import READ_AFTER_WRITE_SECONDS
+import math
+import threading
+import time
+
+# Horário (epoch) da última escrita, devolvido ao cliente e reenviado por ele
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# Subject (e-mail do token) do usuário da requisição corrente, definido por
+# get_current_user; as threads do threadpool recebem uma cópia do contexto
+current_subject = ContextVar("current_subject", default=None)
+# Escrita da requisição corrente: lista mutável, pois o after_commit pode rodar
+# em uma thread do threadpool, que só enxerga uma cópia do contexto
+_request_write = ContextVar("request_write", default=None)
+
+class RecentWriters:
+    """Usuários que gravaram no primário há menos de ttl_seconds.
+
+    As leituras desses usuários vão ao primário em vez da réplica, para que
+    vejam a própria escrita mesmo com atraso de replicação. O registro é por
+    processo; entre workers vale o cookie de ReadAfterWriteMiddleware.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._until = {}
+
+    def mark(self, subject: str):
+        now = time.monotonic()
+        with self._lock:
+            self._until.pop(subject, None)
+            self._until[subject] = now + self.ttl_seconds
+            # Ordem de inserção = ordem de expiração: descartar pelo início
+            while True:
+                oldest = next(iter(self._until))
+                if self._until[oldest] > now and len(self._until) <= self.max_size:
+                    break
+                del self._until[oldest]
+
+    def is_recent(self, subject) -> bool:
+        if subject is None:
+            return False
+        until = self._until.get(subject)
+        return until is not None and until > time.monotonic()
+
+    def __len__(self):
+        return len(self._until)
+
+def mark_writer(session):
+    """after_commit das sessões do primário: registrar o usuário e a requisição"""
+    subject = current_subject.get()
+    if subject is not None:
+        recent_writers.mark(subject)
+    write = _request_write.get()
+    if write is not None:
+        write[0] = time.time()
+
+def wrote_recently(last_write) -> bool:
+    """last_write (cookie ou header, epoch) ainda dentro de READ_AFTER_WRITE_SECONDS"""
+    try:
+        return time.time() - float(last_write) < READ_AFTER_WRITE_SECONDS
+    except (TypeError, ValueError):
+        return False
+
+class ReadAfterWriteMiddleware:
+    """Devolve ao cliente o horário da escrita feita na requisição.
+
+    Cookie de curta duração (e header X-Last-Write, para clientes sem
+    cookies) que as rotas de leitura de qualquer worker conferem: a leitura
+    seguinte vai ao primário mesmo atendida por outro processo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        write = [None]
+        token = _request_write.set(write)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and write[0] is not None:
+                value = f"{write[0]:.3f}"
+                headers = MutableHeaders(scope=message)
+                headers.append(LAST_WRITE_HEADER, value)
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={value}; Max-Age={math.ceil(READ_AFTER_WRITE_SECONDS)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_write.reset(token)
+
+recent_writers = RecentWriters(READ_AFTER_WRITE_SECONDS)
@@ -0,0 +1,84 @@
+from sqlalchemy import text
+from services.price_cache import price_cache
+import asyncio
+import time
+
+class Readiness:
+    """Estado de aquecimento do processo, exposto em /ready.
+
+    Cada etapa da inicialização é marcada ao terminar; o worker só está
+    pronto para receber tráfego quando todas tiverem terminado.
+    """
+
+    def __init__(self, checks):
+        self.checks = dict.fromkeys(checks)
+        self.error = None
+        self._started_at = time.monotonic()
+        self._ready_at = None
+
+    @property
+    def ready(self):
+        return self._ready_at is not None
+
+    def mark(self, name: str, detail=True):
+        """Registrar uma etapa concluída (detail aparece em /ready)"""
+        self.checks[name] = detail
+        if all(value is not None for value in self.checks.values()):
+            self.error = None
+            self._ready_at = time.monotonic()
+
+    def fail(self, error: Exception):
+        self.error = str(error)
+
+    def status(self):
+        status = {
+            "status": "ready" if self.ready else "warming",
+            "checks": {name: detail if detail is not None else False for name, detail in self.checks.items()}
+        }
+        if self.ready:
+            status["warmup_seconds"] = round(self._ready_at - self._started_at, 3)
+        elif self.error is not None:
+            status["error"] = self.error
+        return status
+
+def prewarm_pool(engine):
+    """Abrir todas as conexões do pool (pool_size) e devolvê-las ociosas"""
+    connections = []
+    try:
+        for _ in range(engine.pool.size()):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+async def prewarm_async_pool(engine):
+    """Versão assíncrona de prewarm_pool: as conexões são abertas em paralelo"""
+    async def open_connection():
+        connection = await engine.connect()
+        await connection.execute(text("SELECT 1"))
+        return connection
+
+    results = await asyncio.gather(
+        *(open_connection() for _ in range(engine.pool.size())), return_exceptions=True
+    )
+    connections = [result for result in results if not isinstance(result, BaseException)]
+    for connection in connections:
+        await connection.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(connections)
+
+def load_latest_prices(SessionLocal, assets):
+    """Preencher o cache com o último preço gravado de cada ativo"""
+    db = SessionLocal()
+    try:
+        return sum(price_cache.get(db, crypto) is not None for crypto in assets)
+    finally:
+        db.close()
+
+# O índice de notificações não entra: só o líder o carrega, ao assumir o lease
+readiness = Readiness(["database_pool", "prices"])
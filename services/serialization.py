@@ -0,0 +1,47 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+from schemas import AddressRow, TransactionRow, NotificationRow, NotificationLogRow
+import orjson
+
+class ListSerializer:
+    """Serialização de listagens a partir de linhas (tuplas) das colunas necessárias.
+
+    Em vez de validar um objeto ORM por vez contra o response_model e
+    codificar com o json da stdlib, valida a lista inteira em uma única
+    passada de TypeAdapter (TypedDict, sem instanciar modelos) e codifica
+    com orjson. O JSON produzido tem os mesmos campos, na mesma ordem.
+    """
+
+    def __init__(self, row_type):
+        self.row_type = row_type
+        self.adapter = TypeAdapter(list[row_type])
+
+    def validate(self, rows):
+        """Linhas do banco (Row) ou dicts → lista de dicts validados"""
+        items = []
+        fields = None
+        for row in rows:
+            if isinstance(row, dict):
+                items.append(row)
+                continue
+            if fields is None:
+                fields = row._fields
+            items.append(dict(zip(fields, row)))
+        return self.adapter.validate_python(items)
+
+    def dumps(self, items):
+        return orjson.dumps(items)
+
+    def dump_lines(self, rows):
+        """Linhas como NDJSON (um lote de stream_ndjson)"""
+        return b"".join(orjson.dumps(item) + b"\n" for item in self.validate(rows))
+
+def json_response(content: bytes, response: Response = None):
+    """Resposta JSON já codificada, mantendo os headers definidos na rota (ex.: X-Next-Cursor)"""
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+address_serializer = ListSerializer(AddressRow)
+transaction_serializer = ListSerializer(TransactionRow)
+notification_serializer = ListSerializer(NotificationRow)
+notification_log_serializer = ListSerializer(NotificationLogRow)
@@ -0,0 +1,141 @@
+from config import SINGLE_FLIGHT_TTL_SECONDS
+from services.metrics import SINGLE_FLIGHT_CALLS
+import asyncio
+import threading
+import time
+
+class _Flight:
+    """Contadores e resultados recentes (micro-TTL) comuns às duas versões"""
+
+    def __init__(self, name: str, ttl_seconds: float = 0):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.counts = {"executed": 0, "coalesced": 0, "cached": 0}
+        self._calls = {}
+        self._results = {}
+
+    def _count(self, result: str):
+        self.counts[result] += 1
+        SINGLE_FLIGHT_CALLS.labels(self.name, result).inc()
+
+    def _cached(self, key):
+        """(expira_em, resultado) ainda dentro do micro-TTL, ou None"""
+        entry = self._results.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        self._count("cached")
+        return entry
+
+    def _store(self, key, value):
+        if self.ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        self._results.pop(key, None)
+        self._results[key] = (now + self.ttl_seconds, value)
+        # Mesmo TTL para todos: a ordem de inserção é a de expiração
+        while True:
+            oldest = next(iter(self._results))
+            if self._results[oldest][0] > now:
+                break
+            del self._results[oldest]
+
+    def stats(self):
+        return {**self.counts, "in_flight": len(self._calls)}
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(_Flight):
+    """Compartilha uma chamada em andamento entre threads que pedem a mesma chave.
+
+    A primeira thread executa a função; as demais esperam e recebem o mesmo
+    resultado (ou a mesma exceção). Com ttl_seconds > 0 o resultado ainda é
+    reaproveitado por esse intervalo após a conclusão.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 0):
+        super().__init__(name, ttl_seconds)
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count("executed")
+            else:
+                self._count("coalesced")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._store(key, call.result)
+            call.done.set()
+        return call.result
+
+class AsyncSingleFlight(_Flight):
+    """Versão para o event loop: corrotinas concorrentes aguardam o mesmo Future.
+
+    Se a requisição que executa a consulta for cancelada (cliente
+    desconectou), as que aguardavam repetem a chamada em vez de falhar.
+    """
+
+    async def do(self, key, fn):
+        """fn é chamada sem argumentos e retorna um awaitable"""
+        cached = self._cached(key)
+        if cached is not None:
+            return cached[1]
+        future = self._calls.get(key)
+        if future is not None:
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    return await self.do(key, fn)
+                raise
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self._count("executed")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Evita o aviso de exceção não lida quando ninguém aguardava
+            raise
+        else:
+            future.set_result(result)
+            self._store(key, result)
+            return result
+        finally:
+            del self._calls[key]
+
+# Consultas compartilhadas entre requisições concorrentes idênticas
+latest_price_flight = AsyncSingleFlight("latest_price", SINGLE_FLIGHT_TTL_SECONDS)
+latest_price_sync_flight = SingleFlight("latest_price_sync", SINGLE_FLIGHT_TTL_SECONDS)
+address_balance_flight = AsyncSingleFlight("address_balance", SINGLE_FLIGHT_TTL_SECONDS)
+
+def single_flight_stats():
+    return {
+        flight.name: flight.stats()
+        for flight in (latest_price_flight, latest_price_sync_flight, address_balance_flight)
+    }
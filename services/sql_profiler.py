@@ -0,0 +1,143 @@
+from sqlalchemy import event
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+import threading
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+_current_profile = ContextVar("sql_profile", default=None)
+# Perfis que observam todas as consultas do processo (usados pelos testes,
+# em que o TestClient executa a aplicação em outra thread)
+_process_profiles = []
+_process_lock = threading.Lock()
+
+class QueryProfile:
+    """Consultas SQL executadas dentro de um escopo (requisição ou bloco de teste).
+
+    Consultas com o mesmo texto SQL (parâmetros diferentes) são contadas
+    juntas: repetições indicam o padrão N+1.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = Counter()
+        self.slowest = None
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if self.slowest is None or seconds > self.slowest[2]:
+            self.slowest = (statement, parameters, seconds)
+
+    @property
+    def duplicates(self):
+        """{SQL: execuções} das consultas executadas mais de uma vez"""
+        return {statement: count for statement, count in self.statements.items() if count > 1}
+
+    def summary(self):
+        statement, parameters, seconds = self.slowest or (None, None, 0.0)
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.total_seconds * 1000, 3),
+            "duplicates": self.duplicates,
+            "slowest": {"statement": statement, "parameters": repr(parameters), "ms": round(seconds * 1000, 3)},
+        }
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None or _process_profiles:
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_profiler_start")
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, parameters, seconds)
+    if _process_profiles:
+        with _process_lock:
+            for process_profile in _process_profiles:
+                process_profile.record(statement, parameters, seconds)
+
+def instrument_engine(engine):
+    """Registrar os eventos do profiler em um engine (síncrono ou sync_engine do assíncrono)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def profile_queries(process_wide: bool = False):
+    """Perfilar as consultas executadas dentro do bloco.
+
+    Com process_wide, conta as consultas de todas as threads do processo
+    enquanto o bloco estiver ativo.
+    """
+    profile = QueryProfile()
+    if process_wide:
+        with _process_lock:
+            _process_profiles.append(profile)
+        try:
+            yield profile
+        finally:
+            with _process_lock:
+                _process_profiles.remove(profile)
+        return
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_duplicates: int = 0):
+    """Falhar se o bloco exceder o orçamento de consultas ou repetir consultas.
+
+    Uso em testes:
+        with assert_query_budget(3):
+            client.get("/addresses/1/balance", headers=headers)
+    """
+    with profile_queries(process_wide=True) as profile:
+        yield profile
+    repeated = sum(count - 1 for count in profile.duplicates.values())
+    if profile.count > max_queries or repeated > max_duplicates:
+        details = "\n".join(f"  {count}x {statement}" for statement, count in profile.statements.most_common())
+        raise AssertionError(
+            f"Orçamento de consultas excedido: {profile.count} consulta(s) (máx. {max_queries}), "
+            f"{repeated} repetição(ões) (máx. {max_duplicates})\n{details}"
+        )
+
+class SqlProfilerMiddleware:
+    """Middleware ASGI (opcional) que perfila as consultas de cada requisição.
+
+    Publica X-DB-Queries, X-DB-Time-Ms e X-DB-Duplicates na resposta e
+    registra um log estruturado quando há consultas repetidas ou a
+    requisição passa de slow_ms no banco.
+    """
+
+    def __init__(self, app, slow_ms: float = 100.0):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.count).encode()))
+                headers.append((b"x-db-time-ms", f"{profile.total_seconds * 1000:.3f}".encode()))
+                headers.append((b"x-db-duplicates", str(sum(count - 1 for count in profile.duplicates.values())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with profile_queries() as profile:
+            await self.app(scope, receive, send_wrapper)
+        if profile.duplicates or profile.total_seconds * 1000 >= self.slow_ms:
+            logger.warning("🐢 Perfil SQL da requisição", method=scope["method"], path=scope["path"], **profile.summary())
@@ -0,0 +1,132 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from models import NotificationLog, CryptoType
+from services.event_bus import event_bus
+from services.leader_service import price_leader
+import json
+import threading
+import structlog
+
+logger = structlog.get_logger()
+
+PRICES_TOPIC = "prices"
+NOTIFICATIONS_TOPIC = "notifications"
+
+def sse_message(event: str, data: dict):
+    """Formatar um evento Server-Sent Events (serializado uma única vez por publicação)"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def price_message(crypto, price_usd: float, price_brl: float, last_updated: datetime):
+    return sse_message("price", {
+        "crypto": crypto.value,
+        "price_usd": price_usd,
+        "price_brl": price_brl,
+        "last_updated": last_updated.isoformat() if last_updated else None
+    })
+
+def publish_prices(data: dict, last_updated: datetime):
+    """Enviar um tick {CryptoType: {"usd", "brl"}} aos assinantes de /stream/prices"""
+    if not event_bus.has_subscribers(PRICES_TOPIC):
+        return
+    for crypto, prices in data.items():
+        event_bus.publish(PRICES_TOPIC, price_message(crypto, prices["usd"], prices["brl"], last_updated))
+
+def publish_notification_logs(logs):
+    """Enviar logs recém-gravados aos donos das notificações.
+
+    logs são (id, notification_id, user_id, crypto_type, preço USD, preço BRL, limiar, disparado_em).
+    """
+    if not logs or not event_bus.has_subscribers(NOTIFICATIONS_TOPIC):
+        return
+    for log_id, notification_id, user_id, crypto_type, price_usd, price_brl, threshold, triggered_at in logs:
+        event_bus.publish(NOTIFICATIONS_TOPIC, sse_message("notification", {
+            "id": log_id,
+            "notification_id": notification_id,
+            "crypto_type": crypto_type.value,
+            "current_price_usd": price_usd,
+            "current_price_brl": price_brl,
+            "threshold_value": threshold,
+            "triggered_at": triggered_at.isoformat()
+        }), key=user_id)
+
+class NotificationRelay:
+    """Repassa aos assinantes locais os logs gravados pelo worker líder.
+
+    Uma consulta incremental (id > último) por verificação, e somente
+    enquanto houver assinantes; sem assinantes não consulta nada. O líder
+    também publica por aqui os logs que acabou de gravar.
+    """
+
+    def __init__(self):
+        self.last_id = None
+        # O tick do líder e o relay podem consultar ao mesmo tempo na troca de liderança
+        self._lock = threading.Lock()
+
+    def start(self, db: Session):
+        """Fixar o ponto de partida antes de gravar novos logs"""
+        if self.last_id is None and event_bus.has_subscribers(NOTIFICATIONS_TOPIC):
+            self.last_id = self._latest_id(db)
+
+    def poll(self, db: Session, batch_size: int = 10000):
+        with self._lock:
+            self._poll(db, batch_size)
+
+    def _poll(self, db: Session, batch_size: int):
+        if not event_bus.has_subscribers(NOTIFICATIONS_TOPIC):
+            # Sem assinantes não há o que repassar: nenhuma consulta
+            self.last_id = None
+            return
+        if self.last_id is None:
+            self.last_id = self._latest_id(db)
+            return
+        logs = db.query(
+            NotificationLog.id, NotificationLog.notification_id, NotificationLog.user_id, NotificationLog.crypto_type,
+            NotificationLog.current_price_usd, NotificationLog.current_price_brl,
+            NotificationLog.threshold_value, NotificationLog.triggered_at
+        ).filter(NotificationLog.id > self.last_id).order_by(NotificationLog.id).limit(batch_size).all()
+        if logs:
+            self.last_id = logs[-1][0]
+            publish_notification_logs(logs)
+
+    def _latest_id(self, db: Session):
+        return db.query(NotificationLog.id).order_by(NotificationLog.id.desc()).limit(1).scalar() or 0
+
+class PriceRelay:
+    """Entrega aos workers seguidores cada tick publicado pelo líder.
+
+    O líder grava na linha do lease, junto com os preços, os últimos ticks
+    numerados em sequência. Cada verificação é uma leitura por chave
+    primária que só traz a lista quando a sequência avançou; os ticks
+    novos são devolvidos em ordem, sem pular intermediários.
+    """
+
+    def __init__(self, lease):
+        self.lease = lease
+        self.sequence = None
+
+    def reset(self):
+        """Recomeçar do último tick (o líder publica os próprios ticks)"""
+        self.sequence = None
+
+    def poll(self, db: Session):
+        """Ticks novos como [(gravado_em, {CryptoType: {"usd", "brl"}})], do mais antigo ao mais recente"""
+        published = self.lease.read_since(db, -1 if self.sequence is None else self.sequence)
+        if published is None:
+            if self.sequence is None:
+                self.sequence = 0  # Nenhum líder publicou ainda
+            return []
+        sequence, recent = published
+        if self.sequence is None or sequence < self.sequence:
+            # Primeira leitura (o cache já foi aquecido) ou linha do lease recriada
+            self.sequence = sequence
+            return []
+        if recent and recent[0][0] > self.sequence + 1:
+            logger.warning(f"⚠️ {recent[0][0] - self.sequence - 1} tick(s) do líder não chegaram a este worker")
+        self.sequence = sequence
+        return [
+            (published_at, {CryptoType(symbol): prices for symbol, prices in payload.items()})
+            for _, published_at, payload in recent
+        ]
+
+notification_relay = NotificationRelay()
+price_relay = PriceRelay(price_leader)